@@ -53,13 +53,17 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'testapp.middleware.SQLInstrumentationMiddleware',  # first, so session and auth queries are counted too
+    'testapp.middleware.ReadYourWritesMiddleware',  # before anything that reads the database
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',# If using CORS headers
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'testapp.middleware.JWTSessionMiddleware',  # request.user for template pages, from the session's access token
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'testapp.hashing.HashingBusyMiddleware',  # saturated password hashing on non-API views (admin login): 503, not 500
 ]
 
 ROOT_URLCONF = 'rental_app.urls'
@@ -97,16 +101,24 @@ DATABASES = {
     }
 }
 
+# Reads go to DATABASE_REPLICAS, writes to 'default' (see testapp/routers.py). To add a
+# replica, give it an entry in DATABASES (same NAME/USER, the replica's HOST) and list it here.
+DATABASE_ROUTERS = ['testapp.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []
+DATABASE_READ_YOUR_WRITES_SECONDS = 10  # a client that wrote keeps reading the primary this long; keep above replica lag
+
 
 
 # REST_FRAMEWORK_AUTHENTICATION
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'testapp.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Saturated password hashing (testapp/hashing.py) is a 503 with Retry-After
+    'EXCEPTION_HANDLER': 'testapp.hashing.exception_handler',
 }
 
 # REST_FRAMEWORK = {
@@ -119,6 +131,25 @@ REST_FRAMEWORK = {
 # }
 
 
+# Hashing runs on a bounded pool (see testapp/hashing.py); the first entry replaces Django's
+# PBKDF2PasswordHasher under the same algorithm name, so existing passwords keep working
+PASSWORD_HASHERS = [
+    'testapp.hashing.BoundedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# A login blocks its request thread while it waits for the hash, so only SERVER_THREADS minus
+# PASSWORD_HASH_RESERVED_THREADS logins may wait at once; the reserved threads keep serving pages.
+# Keep SERVER_THREADS equal to the worker's request threads (gunicorn --threads, uwsgi threads).
+SERVER_THREADS = 8
+PASSWORD_HASH_RESERVED_THREADS = 4
+PASSWORD_HASH_WORKERS = 2  # cores a login storm may use per process; the rest keep serving pages
+PASSWORD_HASH_TIMEOUT = 2.0  # seconds a login waits for its hash before 503 + Retry-After
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -188,12 +219,134 @@ SIMPLE_JWT = {
 
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainPairSerializer",
-    "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "testapp.tokens.TokenRefreshSerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
 }
 
 
 
+# Keyset pagination for room listings (API and templates)
+ROOM_PAGE_SIZE = 20
+ROOM_MAX_PAGE_SIZE = 100
+
+# Rows fetched per round trip when streaming the full export (?stream=1)
+ROOM_EXPORT_CHUNK_SIZE = 2000
+
+# Reviews of a room, newest first; the first page is cached (see testapp/cache.py)
+REVIEW_PAGE_SIZE = 10
+
+
+
+# In-process room full-text search (see testapp/search.py)
+ROOM_SEARCH_INDEX_PATH = BASE_DIR / 'room_search_index.pickle'
+ROOM_SEARCH_LIMIT = 50
+# Seconds between catch-ups with rooms changed by other processes, and how far
+# back each one re-reads for transactions that committed after it ran
+ROOM_SEARCH_SYNC_INTERVAL = 30
+ROOM_SEARCH_SYNC_LAG = 60
+
+
+
+# Cache backend; any configured backend works for the room payload cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'room-rental',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Stored responses for Idempotency-Key retries. Must be shared by every
+    # worker, or a retry that lands on another process runs the request again
+    # (bookings are still deduplicated by Booking.request_key, but a reused key
+    # would no longer get its 422). A table in the primary database: create it
+    # with `manage.py createcachetable`. MAX_ENTRIES keeps it bounded.
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'idempotency_cache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+IDEMPOTENCY_CACHE_ALIAS = 'idempotency'
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24  # seconds a retry replays the original response
+
+# Per-room payload cache (see testapp/cache.py)
+ROOM_CACHE_ALIAS = 'default'
+ROOM_CACHE_TIMEOUT = 300  # seconds a payload is served as fresh
+ROOM_CACHE_GRACE = 60  # extra seconds a stale payload may be served while one request refreshes it
+
+
+
+# Resized room image variants (see testapp/images.py)
+ROOM_IMAGE_WIDTHS = [320, 640, 1024]
+ROOM_IMAGE_FORMATS = {'webp': 75, 'jpeg': 80}  # format -> quality
+ROOM_IMAGE_ASYNC = True  # build variants for uploads on a background thread
+ROOM_IMAGE_WORKERS = 2
+
+
+
+# Admin changelists count at most this many rows of a filtered list (see testapp/admin.py)
+ADMIN_COUNT_LIMIT = 10000
+
+
+
+# Per-request SQL counts and timings (see testapp/middleware.py)
+SQL_INSTRUMENTATION = True
+SQL_REPEAT_THRESHOLD = 10  # same query shape more often than this in one request looks like an N+1
+SQL_REPEAT_ACTION = 'warn' if DEBUG else None  # 'warn', 'raise' (DEBUG / tests) or None to only log
+SQL_LOG_LEVEL = 'WARNING'  # 'INFO' also logs one line per request to testapp.sql
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'testapp.sql': {'handlers': ['console'], 'level': SQL_LOG_LEVEL},
+    },
+}
+
+
+
+# Users behind API tokens are cached per process (see testapp/authentication.py).
+# Each read checks a per-user version in JWT_USER_VERSION_CACHE_ALIAS, which a
+# save or delete bumps. On a backend shared by all workers (Redis, memcached) a
+# deactivated user is refused everywhere on the next request. The LocMemCache
+# above is per process, so until then other workers keep accepting the user
+# for up to JWT_USER_CACHE_TTL; keep that short.
+JWT_USER_VERSION_CACHE_ALIAS = 'default'
+JWT_USER_CACHE_TTL = 10  # seconds
+JWT_USER_CACHE_SIZE = 10000
+
+# Refresh-token blacklist lookups go through an in-process Bloom filter (see testapp/tokens.py);
+# expired rows are deleted by `manage.py prune_tokens`, run it from cron
+BLACKLIST_FILTER_CAPACITY = 1_000_000  # tokens before the filter is rebuilt; ~1.2 MB at 1%
+BLACKLIST_FILTER_ERROR_RATE = 0.01  # share of unknown tokens that still need the DB check
+BLACKLIST_FILTER_SYNC_INTERVAL = 1.0  # seconds before tokens blacklisted by other processes are seen
+BLACKLIST_FILTER_SYNC_MARGIN = 1000  # how far below the highest id seen a missing id is still looked for (out-of-order commits)
+BLACKLIST_FILTER_REBUILD_INTERVAL = 3600  # seconds between full rebuilds, the backstop for anything the margin missed
+BLACKLIST_FILTER_ASYNC_REBUILD = True  # rebuild on a background thread, serving the current filter meanwhile
+
+
+# Route room listing, search and details to the async views (testapp/views.py).
+# Turn on when serving rental_app.asgi with uvicorn/daphne; keep off under WSGI.
+ASYNC_READ_VIEWS = False
+
+
+# Sessions stay server-side, so the JWT pair JWTSessionMiddleware authenticates page views
+# with never reaches the browser and sessions can be revoked. cached_db reads them from the
+# cache and only falls back to the table on a miss, which saves a query per page view, but
+# it needs SESSION_CACHE_ALIAS shared by every worker (Redis, memcached): with a per-process
+# LocMemCache a session deleted on one worker (logout) stays valid on the others. So the
+# plain table is used until that cache is shared. JWTSessionMiddleware's refresh coalescing
+# uses the same cache; across processes it falls back to re-reading the session row.
+SESSION_CACHE_ALIAS = 'default'
+if CACHES[SESSION_CACHE_ALIAS]['BACKEND'].endswith('.LocMemCache'):
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
 # cors headers
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -0,0 +1,30 @@
+"""
+Settings for running the test suite without MySQL:
+
+    python manage.py test --settings=rental_app.test_settings
+
+Two local SQLite databases; 'replica' is only routed to by tests that list
+it in DATABASE_REPLICAS, so it never receives the primary's writes.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_primary.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_replica.sqlite3',
+    },
+}
+
+# A background rebuild reads through its own connection, which can't see the
+# rows a TestCase hasn't committed
+BLACKLIST_FILTER_ASYNC_REBUILD = False
+
+# Only N+1 warnings from the SQL middleware, not a line per test request
+SQL_LOG_LEVEL = 'WARNING'
+LOGGING['loggers']['testapp.sql']['level'] = SQL_LOG_LEVEL  # noqa: F405
@@ -1,11 +1,92 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from .models import Room, Booking, Review, User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.conf import settings
+
+
+def estimated_row_count(model, using):
+    """Planner's row estimate for the whole table, None where the backend has none (SQLite)."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table],
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that never runs COUNT(*) over a whole large table.
+    Unfiltered lists use the table statistics; filtered ones count at most
+    ADMIN_COUNT_LIMIT rows, which is as deep as anyone pages in the admin.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = getattr(settings, 'ADMIN_COUNT_LIMIT', 10000)
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.values('pk')[:limit].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # the "N total" link is another full COUNT(*)
+    list_per_page = 50
+
+
+@admin.register(Room)
+class RoomAdmin(LargeTableAdmin):
+    list_display = ['id', 'title', 'location', 'price', 'availability', 'rating_avg', 'rating_count']
+    list_filter = ['availability']  # room_avail_id_idx, in the changelist's -id order
+    ordering = ['-id']
+    # What the search box matches; get_search_results() answers both from an index
+    search_fields = ['=id', 'location_key']
+    search_help_text = "Room id, or part of the location"
+    readonly_fields = ['rating_avg', 'rating_count', 'updated_at']
+
+    def get_search_results(self, request, queryset, search_term):
+        # An id or a location, both answered from an index instead of LIKE '%...%'
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        return queryset.in_location(term), False
+
+
+@admin.register(Booking)
+class BookingAdmin(LargeTableAdmin):
+    list_display = ['id', 'user', 'room', 'check_in', 'check_out', 'booking_date']
+    list_select_related = ['user', 'room']  # __str__ of both is shown on every row
+    list_filter = [('check_in', admin.DateFieldListFilter)]
+    ordering = ['-check_in', '-id']
+    raw_id_fields = ['user', 'room']
+    readonly_fields = ['request_key']
+
+
+@admin.register(Review)
+class ReviewAdmin(LargeTableAdmin):
+    list_display = ['id', 'user', 'room', 'rating', 'created_at']
+    list_select_related = ['user', 'room']
+    list_filter = [('created_at', admin.DateFieldListFilter)]
+    ordering = ['-created_at', '-id']
+    raw_id_fields = ['user', 'room']
 
-# Register your models
-admin.site.register(Room)
-admin.site.register(Booking)
-admin.site.register(Review)
 
 class UserModelAdmin(BaseUserAdmin):
     # The fields to be used in displaying the User model
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TestappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'testapp'
+
+    def ready(self):
+        from . import signals  # noqa: F401  registers the Room signal handlers
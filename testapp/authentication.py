@@ -0,0 +1,81 @@
+import copy
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import LocalCache
+from .routers import PRIMARY
+
+
+# str(user id) -> (version, User row), shared by every request this process authenticates
+user_cache = LocalCache(
+    maxsize=getattr(settings, "JWT_USER_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "JWT_USER_CACHE_TTL", 60),
+)
+
+
+# Per-user version tokens in JWT_USER_VERSION_CACHE_ALIAS. A write to the user
+# swaps the token, and every process drops its copy on the next read.
+def user_versions():
+    return caches[getattr(settings, "JWT_USER_VERSION_CACHE_ALIAS", "default")]
+
+
+def user_version_key(user_id):
+    return f"jwt-user:{user_id}:version"
+
+
+def invalidate_user(user_id):
+    user_versions().set(user_version_key(user_id), time.time_ns(), None)
+    user_cache.invalidate(str(user_id))
+
+
+def cached_user(user_id):
+    """User `user_id` through `user_cache`, or None if there is no such user."""
+    key = str(user_id)
+    # Read before the row, so a write landing in between leaves the entry outdated, not current
+    version = user_versions().get(user_version_key(key))
+    entry = user_cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    # From the primary, so a replica's copy from before a deactivation is never cached
+    user = get_user_model().objects.using(PRIMARY).filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+    if user is not None:
+        user_cache.set(key, (version, user))
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user through `user_cache`
+    instead of reading the User row on every request. Saving or deleting a
+    user bumps its version (see signals.py), which every process checks on
+    each read; the is_active and revoked-token checks still run against the
+    cached row on every request.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        # Each request gets its own instance, so nothing it sets on request.user leaks into the next
+        return copy.copy(user)
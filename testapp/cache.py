@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Review, Room
+from .pagination import KeysetPaginator
+from .routers import PRIMARY
+from .serializers.room_serializers import ReviewSerializer, RoomSerializer
+
+
+# Bump when RoomSerializer output changes so old payloads are never read back
+ROOM_PAYLOAD_SCHEMA = 5
+
+
+class CacheStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {"hits": 0, "misses": 0, "stale_hits": 0, "coalesced": 0, "invalidations": 0}
+
+    def incr(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts)
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU with a per-entry TTL, for objects worth keeping in
+    the worker itself. Entries are not shared between processes: invalidation
+    only reaches the current one, so the TTL bounds how stale others can be.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self.stats = CacheStats()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.stats.incr("hits")
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+        self.stats.incr("misses")
+        return None
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self.stats.incr("invalidations")
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class ObjectCache:
+    """
+    Versioned per-object cache of serialized payloads.
+
+    Every object has a version token in the cache and payloads are stored under
+    that version. Invalidation swaps the token, so a reader that loaded the row
+    before a write can only store its payload under the dead version.
+
+    Payloads carry a soft expiry a little ahead of the real one. Once it passes,
+    the first caller to win `cache.add` on the lock key reloads the object while
+    everyone else keeps serving the stale copy. On a cold miss, callers that
+    lose the lock wait briefly for the winner instead of all hitting the DB.
+    """
+
+    def __init__(self, prefix, loader, timeout=300, grace=60, lock_timeout=5,
+                 wait_interval=0.02, wait_attempts=10, alias="default"):
+        self.prefix = prefix
+        self.loader = loader
+        self.timeout = timeout
+        self.grace = grace
+        self.lock_timeout = lock_timeout
+        self.wait_interval = wait_interval
+        self.wait_attempts = wait_attempts
+        self.alias = alias
+        self.stats = CacheStats()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def version_key(self, pk):
+        return f"{self.prefix}:{pk}:version"
+
+    def lock_key(self, pk):
+        return f"{self.prefix}:{pk}:lock"
+
+    def get_version(self, pk):
+        key = self.version_key(pk)
+        version = self.cache.get(key)
+        if version is None:
+            # Time-based tokens can't collide with a version that was evicted earlier
+            self.cache.add(key, time.time_ns(), None)
+            version = self.cache.get(key)
+        return version
+
+    def payload_key(self, pk, version):
+        return f"{self.prefix}:{pk}:{version}"
+
+    def fill(self, key, pk):
+        data = self.loader(pk)
+        if data is not None:
+            entry = {"data": data, "fresh_until": time.time() + self.timeout}
+            self.cache.set(key, entry, self.timeout + self.grace)
+        return data
+
+    def get(self, pk):
+        """Return the cached payload for `pk`, loading it at most once per expiry. None if it doesn't exist."""
+        key = self.payload_key(pk, self.get_version(pk))
+        entry = self.cache.get(key)
+
+        if entry is not None:
+            if entry["fresh_until"] > time.time():
+                self.stats.incr("hits")
+                return entry["data"]
+            if not self.cache.add(self.lock_key(pk), 1, self.lock_timeout):
+                self.stats.incr("stale_hits")
+                return entry["data"]
+            try:
+                self.stats.incr("misses")
+                return self.fill(key, pk)
+            finally:
+                self.cache.delete(self.lock_key(pk))
+
+        self.stats.incr("misses")
+        if self.cache.add(self.lock_key(pk), 1, self.lock_timeout):
+            try:
+                return self.fill(key, pk)
+            finally:
+                self.cache.delete(self.lock_key(pk))
+
+        # Someone else is loading this object, give them a moment
+        for _ in range(self.wait_attempts):
+            time.sleep(self.wait_interval)
+            entry = self.cache.get(key)
+            if entry is not None:
+                self.stats.incr("coalesced")
+                return entry["data"]
+        return self.fill(key, pk)
+
+    def invalidate(self, pk):
+        self.stats.incr("invalidations")
+        self.cache.set(self.version_key(pk), time.time_ns(), None)
+
+
+# Fills read the primary: a fill follows an invalidation, and a replica that hasn't
+# caught up with that write would get its old row cached for everyone
+def load_room_payload(pk):
+    room = Room.objects.using(PRIMARY).filter(pk=pk).first()
+    return dict(RoomSerializer(room).data) if room is not None else None
+
+
+room_cache = ObjectCache(
+    prefix=f"room:v{ROOM_PAYLOAD_SCHEMA}",
+    loader=load_room_payload,
+    timeout=getattr(settings, "ROOM_CACHE_TIMEOUT", 300),
+    grace=getattr(settings, "ROOM_CACHE_GRACE", 60),
+    alias=getattr(settings, "ROOM_CACHE_ALIAS", "default"),
+)
+
+
+# A room's newest reviews: the page nearly every visitor of the room sees
+review_paginator = KeysetPaginator(
+    ordering=("-created_at", "-id"), page_size=getattr(settings, "REVIEW_PAGE_SIZE", 10),
+)
+
+
+def room_reviews(room_id):
+    return Review.objects.filter(room_id=room_id).select_related("user")
+
+
+def load_first_review_page(room_id):
+    if not Room.objects.using(PRIMARY).filter(pk=room_id).exists():
+        return None
+    page = review_paginator.paginate(room_reviews(room_id).using(PRIMARY), {})
+    return {"results": ReviewSerializer(page.items, many=True).data, "next_cursor": page.next_cursor}
+
+
+review_page_cache = ObjectCache(
+    prefix=f"room-reviews:v{ROOM_PAYLOAD_SCHEMA}",
+    loader=load_first_review_page,
+    timeout=getattr(settings, "ROOM_CACHE_TIMEOUT", 300),
+    grace=getattr(settings, "ROOM_CACHE_GRACE", 60),
+    alias=getattr(settings, "ROOM_CACHE_ALIAS", "default"),
+)
@@ -0,0 +1,92 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+
+
+class Validators:
+    """ETag / Last-Modified pair for one response, computed before any serialization happens."""
+
+    def __init__(self, etag, last_modified=None):
+        self.etag = etag
+        self.last_modified = last_modified  # aware datetime or None
+
+    @property
+    def timestamp(self):
+        return int(self.last_modified.timestamp()) if self.last_modified else None
+
+    def not_modified(self, request):
+        """Return a 304 response when the client's copy is still current, else None."""
+        response = get_conditional_response(request, etag=self.etag, last_modified=self.timestamp)
+        if response is not None and response.status_code == 304:
+            # A 304 carries the validators the full response would have had
+            self.apply(response)
+        return response
+
+    def apply(self, response):
+        response["ETag"] = self.etag
+        if self.last_modified:
+            response["Last-Modified"] = http_date(self.timestamp)
+        return response
+
+
+def make_etag(*parts):
+    digest = hashlib.md5("|".join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def collection_stats():
+    return {"last_modified": Max("updated_at"), "count": Count("id")}
+
+
+# Columns a page's rows must carry for page_validators()
+PAGE_VALIDATOR_COLUMNS = ("id", "updated_at")
+
+
+def page_validators(request, page, key):
+    """
+    Validators for one keyset page, taken from the rows already fetched for
+    it, so the rest of the table is never read. `key` returns a row's
+    (id, updated_at). The tag covers those and the page's cursors, so any
+    insert, update or delete that changes what the page shows changes it.
+    """
+    etag = make_etag(
+        request.get_full_path(), request.META.get("HTTP_ACCEPT", ""),
+        page.next_cursor, page.previous_cursor, *(key(row) for row in page.items),
+    )
+    return Validators(etag)
+
+
+def collection_validators(request, queryset):
+    """
+    For whole-collection responses (the ?stream=1 export), which read every
+    row anyway. One aggregate query: the newest updated_at plus the row
+    count. Any insert, update or delete changes one of them. The request
+    path and query string are part of the tag.
+    Collections get no Last-Modified: a delete doesn't move MAX(updated_at),
+    so If-Modified-Since alone would keep answering 304 with the row gone.
+    """
+    return validators_from_stats(request, queryset.order_by().aggregate(**collection_stats()))
+
+
+async def acollection_validators(request, queryset):
+    return validators_from_stats(request, await queryset.order_by().aaggregate(**collection_stats()))
+
+
+def validators_from_stats(request, stats):
+    etag = make_etag(
+        request.get_full_path(), request.META.get("HTTP_ACCEPT", ""),
+        stats["count"], stats["last_modified"] and stats["last_modified"].isoformat(),
+    )
+    return Validators(etag)
+
+
+def object_validators(payload, variant=None):
+    """
+    Validators for a serialized room payload, so cached details need no query at all.
+    `variant` tells apart representations of the same room, e.g. a ?fields= subset.
+    """
+    last_modified = parse_datetime(payload["updated_at"]) if payload.get("updated_at") else None
+    return Validators(make_etag("room", payload["id"], payload.get("updated_at"), variant or ""), last_modified)
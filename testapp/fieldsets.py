@@ -0,0 +1,27 @@
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def requested_fields(params, serializer_class):
+    """
+    Field names asked for with ?fields=a,b and/or ?omit=c, in the serializer's
+    own order. None when the client wants the full representation.
+    """
+    fields, omit = params.get("fields"), params.get("omit")
+    if not fields and not omit:
+        return None
+    available = serializer_class.field_names()
+    chosen = parse_names(fields) if fields else available
+    omitted = parse_names(omit) if omit else []
+    unknown = sorted(set(chosen + omitted) - set(available))
+    if unknown:
+        raise InvalidFields(f"Unknown field(s): {', '.join(unknown)}")
+    return [name for name in available if name in chosen and name not in omitted]
+
+
+def trim(data, fields):
+    return data if fields is None else {name: data[name] for name in fields}
@@ -0,0 +1,198 @@
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler
+
+
+logger = logging.getLogger(__name__)
+
+
+class HashingBusy(Exception):
+    """
+    Every hashing slot is taken; retry in `wait` seconds. Raised from the
+    hasher, so from any code that checks or sets a password: the API answers
+    it through exception_handler(), other views through HashingBusyMiddleware.
+    """
+
+    message = "Too many sign-ins right now, please retry shortly."
+
+    def __init__(self, wait):
+        super().__init__(self.message)
+        self.wait = wait
+
+
+def busy_response(error, response_class=HttpResponse, **kwargs):
+    response = response_class(status=status.HTTP_503_SERVICE_UNAVAILABLE, **kwargs)
+    response["Retry-After"] = str(error.wait)
+    return response
+
+
+def exception_handler(exc, context):
+    """DRF's exception handler, plus HashingBusy as a 503 with Retry-After."""
+    if isinstance(exc, HashingBusy):
+        return busy_response(exc, Response, data={"detail": str(exc)})
+    return drf_exception_handler(exc, context)
+
+
+class HashingBusyMiddleware:
+    """503 with Retry-After instead of a 500 when a non-API view (e.g. the admin login) hits HashingBusy."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingBusy):
+            return busy_response(exception, content=str(exception), content_type="text/plain")
+        return None
+
+
+class HashingStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.depth = 0  # hashes queued or running
+        self.max_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds = 0.0
+        self.max_hash_seconds = 0.0
+
+    def enter(self):
+        with self.lock:
+            self.depth += 1
+            self.max_depth = max(self.max_depth, self.depth)
+
+    def leave(self):
+        with self.lock:
+            self.depth -= 1
+
+    def record(self, elapsed):
+        with self.lock:
+            self.completed += 1
+            self.hash_seconds += elapsed
+            self.max_hash_seconds = max(self.max_hash_seconds, elapsed)
+
+    def reject(self):
+        with self.lock:
+            self.rejected += 1
+
+    def average(self):
+        return self.hash_seconds / self.completed if self.completed else 0.0
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "queue_depth": self.depth,
+                "max_queue_depth": self.max_depth,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_hash_ms": round(self.average() * 1000, 1),
+                "max_hash_ms": round(self.max_hash_seconds * 1000, 1),
+            }
+
+
+class HashingExecutor:
+    """
+    Runs password hashes on a small fixed pool so a login storm can use at
+    most `workers` cores. The request thread waits for its hash, so at most
+    `queue_limit` hashes wait or run at once, which keeps the other request
+    threads free for pages; past that, and for callers that waited longer
+    than `timeout`, HashingBusy is raised instead of queueing more work.
+    """
+
+    def __init__(self, workers=2, queue_limit=4, timeout=2.0):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(queue_limit)
+        self.stats = HashingStats()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hashing")
+        return self._pool
+
+    def retry_after(self):
+        # Seconds for the pool to drain a full queue at the current average hash time
+        return max(1, math.ceil(self.queue_limit / self.workers * self.stats.average()))
+
+    def busy(self):
+        self.stats.reject()
+        wait = self.retry_after()
+        logger.warning("Password hashing saturated, rejecting with Retry-After %ss (%s)", wait, self.stats.snapshot())
+        return HashingBusy(wait)
+
+    def timed(self, func, args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.stats.record(time.perf_counter() - started)
+
+    def release(self, future):
+        # Runs once the hash finished or was cancelled, so slots count real work on the pool
+        self.stats.leave()
+        self.slots.release()
+
+    def run(self, func, *args):
+        if threading.current_thread().name.startswith("password-hashing"):
+            return func(*args)
+        if not self.slots.acquire(blocking=False):
+            raise self.busy()
+
+        self.stats.enter()
+        future = self.pool.submit(self.timed, func, args)
+        future.add_done_callback(self.release)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Drop it if it is still queued; a running hash finishes with nobody waiting
+            future.cancel()
+            raise self.busy()
+
+
+def admission_limit():
+    """Request threads that may wait on a hash: the server's threads minus the ones kept for other requests."""
+    limit = getattr(settings, "PASSWORD_HASH_QUEUE_LIMIT", None)
+    if limit is None:
+        threads = getattr(settings, "SERVER_THREADS", 8)
+        limit = threads - getattr(settings, "PASSWORD_HASH_RESERVED_THREADS", threads // 2)
+    return max(1, limit)
+
+
+password_hashing = HashingExecutor(
+    workers=getattr(settings, "PASSWORD_HASH_WORKERS", 2),
+    queue_limit=admission_limit(),
+    timeout=getattr(settings, "PASSWORD_HASH_TIMEOUT", 2.0),
+)
+
+
+class BoundedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Django's default hasher, run on `password_hashing`. It keeps the
+    pbkdf2_sha256 algorithm name, so stored hashes verify unchanged; list it
+    in PASSWORD_HASHERS instead of PBKDF2PasswordHasher, not next to it.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        return password_hashing.run(super().encode, password, salt, iterations)
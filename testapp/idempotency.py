@@ -0,0 +1,69 @@
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+IDEMPOTENCY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+
+
+def request_key(request):
+    """sha256 of the client's Idempotency-Key header (so any length fits in Booking.request_key), or None."""
+    key = request.META.get(IDEMPOTENCY_HEADER, "").strip()
+    return hashlib.sha256(key.encode()).hexdigest() if key else None
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method}|{request.path}|{body}".encode()).hexdigest()
+
+
+def idempotent(view_method):
+    """
+    Replay the stored response when a client retries an APIView method with the
+    same Idempotency-Key, instead of running it again. Responses are kept in the
+    bounded IDEMPOTENCY_CACHE_ALIAS cache for IDEMPOTENCY_KEY_TTL seconds, per user.
+    Server errors are not stored so the client can retry them.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request_key(request)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+
+        cache = caches[getattr(settings, "IDEMPOTENCY_CACHE_ALIAS", "default")]
+        ttl = getattr(settings, "IDEMPOTENCY_KEY_TTL", 60 * 60 * 24)
+        cache_key = f"idempotency:{request.user.pk}:{key}"
+        fingerprint = _fingerprint(request)
+
+        # Reserve the key; whoever loses the race sees the pending marker or the final response
+        if not cache.add(cache_key, {"fingerprint": fingerprint, "pending": True}, ttl):
+            stored = cache.get(cache_key)
+            if stored is not None:
+                if stored["fingerprint"] != fingerprint:
+                    return Response({"error": "Idempotency-Key was already used for a different request"},
+                                    status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                if stored.get("pending"):
+                    return Response({"error": "A request with this Idempotency-Key is still in progress"},
+                                    status=status.HTTP_409_CONFLICT)
+                response = Response(stored["data"], status=stored["status"])
+                response["Idempotent-Replayed"] = "true"
+                return response
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+        if response.status_code >= 500:
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, {"fingerprint": fingerprint, "status": response.status_code, "data": response.data}, ttl)
+        return response
+
+    return wrapper
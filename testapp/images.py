@@ -0,0 +1,144 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Room
+from .routers import PRIMARY
+
+
+logger = logging.getLogger(__name__)
+
+
+PIL_FORMATS = {"jpeg": "JPEG", "webp": "WEBP"}
+
+
+def variant_widths():
+    return getattr(settings, "ROOM_IMAGE_WIDTHS", [320, 640, 1024])
+
+
+def variant_formats():
+    # format -> encoder quality
+    return getattr(settings, "ROOM_IMAGE_FORMATS", {"webp": 75, "jpeg": 80})
+
+
+def variant_name(name, width, fmt):
+    """room_images/home1.jpg -> room_images/home1.w320.webp, stored next to the original."""
+    root, _ = os.path.splitext(name)
+    return f"{root}.w{width}.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def generate_variants(name, storage=None):
+    """
+    Resize and recompress one original into every configured width and format.
+    Never upscales: widths past the original collapse into one full-width copy.
+    Pure function of the file, so it is safe to run in worker processes.
+    """
+    storage = storage or default_storage
+    with storage.open(name, "rb") as handle:
+        original = ImageOps.exif_transpose(Image.open(handle))
+        original = original.convert("RGB")
+
+    variants = []
+    for width in sorted({min(width, original.width) for width in variant_widths()}):
+        height = max(1, round(original.height * width / original.width))
+        resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+        for fmt, quality in variant_formats().items():
+            buffer = io.BytesIO()
+            resized.save(buffer, PIL_FORMATS[fmt], quality=quality, optimize=True)
+            target = variant_name(name, width, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            variants.append({"name": target, "width": width, "format": fmt})
+    return {"source": name, "variants": variants}
+
+
+def apply_variants(result):
+    """
+    Record generated variants on every room that uses this original and drop
+    their cached payloads. Bypasses save() and its signals; returns the number
+    of rooms updated.
+    """
+    from .cache import room_cache
+
+    # From the primary: the upload that asked for these variants may not have reached a replica yet
+    room_ids = list(Room.objects.using(PRIMARY).filter(image=result["source"]).values_list("id", flat=True))
+    updated = Room.objects.filter(id__in=room_ids, image=result["source"]).update(
+        image_variants=result, updated_at=timezone.now(),
+    )
+    for room_id in room_ids:
+        room_cache.invalidate(room_id)
+    return updated
+
+
+def needs_variants(room):
+    return bool(room.image) and (room.image_variants or {}).get("source") != room.image.name
+
+
+def variant_urls(image_variants, storage=None):
+    storage = storage or default_storage
+    return [
+        {"url": storage.url(variant["name"]), "width": variant["width"], "format": variant["format"]}
+        for variant in (image_variants or {}).get("variants", [])
+    ]
+
+
+def thumbnail_url(image, image_variants, storage=None):
+    """URL of the narrowest variant in the preferred format, else of the original (a FieldFile or a name)."""
+    storage = storage or default_storage
+    variants = (image_variants or {}).get("variants", [])
+    preferred = next(iter(variant_formats()), None)
+    candidates = [variant for variant in variants if variant["format"] == preferred] or variants
+    if candidates:
+        return storage.url(min(candidates, key=lambda variant: variant["width"])["name"])
+    name = getattr(image, "name", image)
+    return storage.url(name) if name else None
+
+
+def srcset(variants, fmt):
+    """Build an srcset string from variant_urls() output for one format."""
+    return ", ".join(f"{variant['url']} {variant['width']}w" for variant in variants if variant["format"] == fmt)
+
+
+# Uploads from the API and admin are processed off the request thread
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "ROOM_IMAGE_WORKERS", 2), thread_name_prefix="room-images",
+            )
+    return _executor
+
+
+def build_room_variants(room_id, name):
+    apply_variants(generate_variants(name))
+
+
+def _build_in_background(room_id, name):
+    try:
+        build_room_variants(room_id, name)
+    except Exception:
+        logger.exception("Could not build image variants for room %s (%s)", room_id, name)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(room):
+    if getattr(settings, "ROOM_IMAGE_ASYNC", True):
+        get_executor().submit(_build_in_background, room.pk, room.image.name)
+    else:
+        build_room_variants(room.pk, room.image.name)
@@ -0,0 +1,406 @@
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from testapp.models import Booking, Review, Room, User, normalize_location
+from testapp.services.auth_services import get_tokens_for_user
+
+
+BENCH_EMAIL = "bench-user-{}@example.com"
+BENCH_PASSWORD = "bench-user-password"
+REGISTER_PREFIX = "bench-register-"
+LOCATIONS = ["Delhi", "Mumbai", "Pune", "Bengaluru", "Hyderabad", "Chennai", "Kolkata", "Jaipur", "Goa", "Kochi"]
+
+# Stays written by the run sit far in the future so they never meet seeded ones and are easy to clean up
+BOOK_FROM = date(2100, 1, 1)
+CANCEL_FROM = date(2200, 1, 1)
+
+ROUTES = [
+    "list", "list_sparse", "filter", "filter_rating", "retrieve", "available", "reviews", "my_bookings",
+    "profile", "room_listing", "book", "cancel", "login", "register",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "End-to-end API benchmark: seed users, rooms, bookings and reviews up to the requested volumes, "
+        "then drive every route with concurrent in-process requests through the full middleware stack "
+        "and report throughput and p50/p95/p99 latency as JSON. Run it against a scratch SQLite database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--rooms", type=int, default=20_000)
+        parser.add_argument("--bookings", type=int, default=20_000)
+        parser.add_argument("--reviews", type=int, default=20_000)
+        parser.add_argument("--skip-seed", action="store_true", help="Use the data already in the database")
+        parser.add_argument(
+            "--allow-non-sqlite", action="store_true",
+            help="Seed even when the default database isn't SQLite (it gets tens of thousands of bench rows)",
+        )
+        parser.add_argument("--requests", type=int, default=200, help="Timed requests per route")
+        parser.add_argument("--concurrency", type=int, default=4, help="Worker threads per route")
+        parser.add_argument("--warmup", type=int, default=10, help="Untimed requests per route first")
+        parser.add_argument("--routes", default=",".join(ROUTES), help=f"Comma-separated subset of: {', '.join(ROUTES)}")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed for request parameters")
+        parser.add_argument("--output", default=None, help="Write the JSON report here (default: stdout)")
+        parser.add_argument("--compare", default=None, help="Earlier JSON report to compare against")
+        parser.add_argument("--threshold", type=float, default=0.2, help="p95 growth counted as a regression (0.2 = 20%%)")
+        parser.add_argument("--fail-on-regression", action="store_true")
+        parser.add_argument("--debug", action="store_true", help="Keep DEBUG on (query logging skews timings)")
+
+    def handle(self, *args, **options):
+        routes = [route.strip() for route in options["routes"].split(",") if route.strip()]
+        unknown = set(routes) - set(ROUTES)
+        if unknown:
+            raise CommandError(f"Unknown route(s): {', '.join(sorted(unknown))}")
+        if connection.vendor != "sqlite":
+            if not options["skip_seed"] and not options["allow_non_sqlite"]:
+                raise CommandError(
+                    f"Refusing to seed the {connection.vendor} database {connection.settings_dict['NAME']!r}. "
+                    "Point DATABASES['default'] at a scratch SQLite file, or pass --allow-non-sqlite "
+                    "if this database is meant to receive bench data."
+                )
+            self.stderr.write(self.style.WARNING(f"Running against {connection.vendor}, results are not comparable to SQLite runs"))
+
+        if not options["skip_seed"]:
+            self.seed(options)
+        volumes = {
+            "users": User.objects.count(), "rooms": Room.objects.count(),
+            "bookings": Booking.objects.count(), "reviews": Review.objects.count(),
+        }
+        self.log(f"data: {volumes}")
+
+        self.random = random.Random(options["seed"])
+        self.users = list(User.objects.filter(email__startswith="bench-user-").order_by("id")[:max(options["concurrency"], 1) * 4])
+        if not self.users:
+            raise CommandError("No bench users in the database, run without --skip-seed first")
+        self.tokens = {user.pk: get_tokens_for_user(user)["access"] for user in self.users}
+        self.room_ids = list(Room.objects.order_by("?").values_list("id", flat=True)[:1000])
+        self.reviewed_room_ids = list(Review.objects.order_by("?").values_list("room_id", flat=True)[:200]) or self.room_ids
+
+        results = {}
+        overrides = {} if options["debug"] else {"DEBUG": False, "ALLOWED_HOSTS": ["localhost"]}
+        try:
+            with override_settings(**overrides):
+                for route in routes:
+                    results[route] = self.run_route(route, options)
+                    self.log(self.format_line(route, results[route]))
+        finally:
+            self.cleanup()
+
+        report = {
+            "meta": self.meta(options, volumes),
+            "routes": results,
+        }
+        text = json.dumps(report, indent=2, default=str)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(text + "\n")
+            self.log(f"report written to {options['output']}")
+        else:
+            self.stdout.write(text)
+
+        if options["compare"]:
+            regressions = self.compare(options["compare"], results, options["threshold"])
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"p95 regressed on: {', '.join(regressions)}")
+
+    # ---- seeding ------------------------------------------------------------
+
+    def seed(self, options):
+        started = time.perf_counter()
+        self.seed_users(options["users"])
+        self.seed_rooms(options["rooms"])
+        self.seed_bookings(options["bookings"])
+        if self.seed_reviews(options["reviews"]):
+            # bulk_create skips the review signals
+            call_command("reconcile_room_ratings", stdout=self.stderr)
+        self.log(f"seeded in {time.perf_counter() - started:.1f}s")
+
+    def bulk(self, model, objects, batch_size=5000):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                model.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch)
+
+    def seed_users(self, target):
+        existing = User.objects.filter(email__startswith="bench-user-").count()
+        if existing >= target:
+            return
+        # Hash once: every bench user shares the password, and hashing is the slow part
+        prototype = User(email="", name="")
+        prototype.set_password(BENCH_PASSWORD)
+        self.bulk(User, (
+            User(email=BENCH_EMAIL.format(i), name=f"Bench {i}", tc=True, password=prototype.password)
+            for i in range(existing, target)
+        ))
+
+    def seed_rooms(self, target):
+        existing = Room.objects.count()
+        rng = random.Random(existing)
+
+        def rooms():
+            for i in range(existing, target):
+                # Skewed like real inventory: a few cities hold most rooms
+                location = LOCATIONS[min(int(rng.paretovariate(1.2)) - 1, len(LOCATIONS) - 1)]
+                yield Room(
+                    image="room_images/home1.jpg", title=f"Room {i}", location=location,
+                    location_key=normalize_location(location), price=Decimal(rng.randrange(500, 20000)),
+                    availability=rng.random() < 0.8, description=f"Seeded room {i} in {location}, close to transport.",
+                )
+        self.bulk(Room, rooms())
+
+    def seed_bookings(self, target):
+        existing = Booking.objects.count()
+        if existing >= target:
+            return
+        user_ids = list(User.objects.filter(email__startswith="bench-user-").values_list("id", flat=True))
+        room_ids = list(Room.objects.values_list("id", flat=True))
+        start = date(2025, 1, 1)
+
+        def bookings():
+            # Row i books room i % rooms for week i // rooms: seeded stays never overlap
+            for i in range(existing, target):
+                check_in = start + timedelta(days=7 * (i // len(room_ids)))
+                yield Booking(
+                    user_id=user_ids[i % len(user_ids)], room_id=room_ids[i % len(room_ids)],
+                    check_in=check_in, check_out=check_in + timedelta(days=3),
+                )
+        self.bulk(Booking, bookings())
+
+    def seed_reviews(self, target):
+        existing = Review.objects.count()
+        if existing >= target:
+            return False
+        user_ids = list(User.objects.filter(email__startswith="bench-user-").values_list("id", flat=True))
+        room_ids = list(Room.objects.values_list("id", flat=True))
+        rng = random.Random(existing)
+        self.bulk(Review, (
+            Review(
+                user_id=rng.choice(user_ids), room_id=rng.choice(room_ids),
+                rating=rng.randint(1, 5), comment="Seeded review",
+            )
+            for _ in range(existing, target)
+        ))
+        return True
+
+    # ---- load ---------------------------------------------------------------
+
+    def run_route(self, route, options):
+        build = getattr(self, f"request_{route}")
+        local = threading.local()
+        thread_numbers = itertools.count()
+
+        def client():
+            # One client and one signed-in user per worker thread
+            if not hasattr(local, "client"):
+                local.client = Client(HTTP_HOST="localhost")
+                local.user = self.users[next(thread_numbers) % len(self.users)]
+            return local.client, local.user
+
+        def one(index):
+            http, user = client()
+            method, path, data, auth = build(user, index)
+            # auth: False, True for the worker's user, or the id of the user to act as
+            auth_id = user.pk if auth is True else auth
+            headers = {"HTTP_AUTHORIZATION": f"Bearer {self.tokens[auth_id]}"} if auth_id else {}
+            started = time.perf_counter()
+            try:
+                if method == "get":
+                    response = http.get(path, data or {}, **headers)
+                elif method == "post":
+                    response = http.post(path, data or {}, content_type="application/json", **headers)
+                else:
+                    response = http.delete(path, **headers)
+                status = response.status_code
+                if getattr(response, "streaming", False):
+                    b"".join(response.streaming_content)
+            except Exception as e:
+                status = type(e).__name__
+            return (time.perf_counter() - started) * 1000, status
+
+        def worker(indexes):
+            try:
+                return [one(index) for index in indexes]
+            finally:
+                connections.close_all()
+
+        def run(total, offset):
+            concurrency = max(1, options["concurrency"])
+            chunks = [range(offset + i, offset + total, concurrency) for i in range(concurrency)]
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                return [sample for samples in pool.map(worker, chunks) for sample in samples]
+
+        self.prepare(route, options["requests"] + options["warmup"])
+        run(options["warmup"], 0)
+        started = time.perf_counter()
+        samples = run(options["requests"], options["warmup"])
+        elapsed = time.perf_counter() - started
+        return self.summarize(samples, elapsed, options["concurrency"])
+
+    def prepare(self, route, count):
+        """Untimed setup some routes need, e.g. one booking per cancel request."""
+        if route == "cancel":
+            self.cancel_ids = []
+            for index in range(count):
+                user = self.users[index % len(self.users)]
+                check_in = CANCEL_FROM + timedelta(days=3 * index)
+                booking, _ = Booking.objects.book(user, self.room_ids[index % len(self.room_ids)], check_in, check_in + timedelta(days=1))
+                self.cancel_ids.append((user.pk, booking.pk))
+
+    def room_id(self):
+        return self.random.choice(self.room_ids)
+
+    # Each builder returns (method, path, data, auth)
+    def request_list(self, user, index):
+        return "get", reverse("list_rooms"), None, True
+
+    def request_list_sparse(self, user, index):
+        return "get", reverse("list_rooms"), {"fields": "id,title,price,location,thumbnail", "page_size": 50}, True
+
+    def request_filter(self, user, index):
+        low = self.random.randrange(500, 15000)
+        params = {"location": self.random.choice(LOCATIONS), "price_min": low, "price_max": low + 5000, "available": "true"}
+        return "get", reverse("Search_filter"), params, True
+
+    def request_filter_rating(self, user, index):
+        return "get", reverse("Search_filter"), {"sort": "rating", "min_rating": 3}, True
+
+    def request_retrieve(self, user, index):
+        return "get", reverse("retrieve_room", args=[self.room_id()]), None, True
+
+    def request_available(self, user, index):
+        check_in = date(2025, 1, 1) + timedelta(days=self.random.randrange(0, 365))
+        params = {"check_in": check_in.isoformat(), "check_out": (check_in + timedelta(days=2)).isoformat()}
+        return "get", reverse("available_rooms"), params, True
+
+    def request_reviews(self, user, index):
+        return "get", reverse("room_reviews", args=[self.random.choice(self.reviewed_room_ids)]), None, False
+
+    def request_my_bookings(self, user, index):
+        return "get", reverse("my_bookings"), None, True
+
+    def request_profile(self, user, index):
+        return "get", reverse("profile"), None, True
+
+    def request_room_listing(self, user, index):
+        return "get", reverse("room_listing"), None, False
+
+    def request_book(self, user, index):
+        check_in = BOOK_FROM + timedelta(days=2 * index)
+        data = {"check_in": check_in.isoformat(), "check_out": (check_in + timedelta(days=1)).isoformat()}
+        return "post", reverse("booking_room", args=[self.room_id()]), data, True
+
+    def request_cancel(self, user, index):
+        user_id, booking_id = self.cancel_ids[index]
+        return "delete", reverse("delete_room", args=[booking_id]), None, user_id
+
+    def request_login(self, user, index):
+        return "post", reverse("login"), {"email": user.email, "password": BENCH_PASSWORD}, False
+
+    def request_register(self, user, index):
+        email = f"{REGISTER_PREFIX}{uuid.uuid4().hex[:12]}@example.com"
+        data = {"email": email, "name": "Bench", "password": BENCH_PASSWORD, "password2": BENCH_PASSWORD, "tc": True}
+        return "post", reverse("register"), data, False
+
+    # ---- reporting ------------------------------------------------------------
+
+    def summarize(self, samples, elapsed, concurrency):
+        latencies = sorted(latency for latency, _ in samples)
+        statuses = Counter(str(status) for _, status in samples)
+        errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 500)
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+        return {
+            "requests": len(samples),
+            "concurrency": concurrency,
+            "errors": errors,
+            "status": dict(sorted(statuses.items())),
+            "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else None,
+            "latency_ms": {
+                "mean": round(statistics.fmean(latencies), 2),
+                "p50": round(cuts[49], 2),
+                "p95": round(cuts[94], 2),
+                "p99": round(cuts[98], 2),
+                "max": round(latencies[-1], 2),
+            },
+        }
+
+    def format_line(self, route, result):
+        latency = result["latency_ms"]
+        return (
+            f"{route:>14}: {result['throughput_rps']:>8} req/s  p50={latency['p50']:.1f}ms "
+            f"p95={latency['p95']:.1f}ms p99={latency['p99']:.1f}ms  status={result['status']}"
+        )
+
+    def meta(self, options, volumes):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=settings.BASE_DIR, timeout=10,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            "commit": commit,
+            "timestamp": datetime.now(dt_timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "debug": bool(options["debug"]),
+            "data": volumes,
+            "requests_per_route": options["requests"],
+            "concurrency": options["concurrency"],
+            "seed": options["seed"],
+        }
+
+    def compare(self, path, results, threshold):
+        with open(path) as handle:
+            baseline = json.load(handle)
+        regressions = []
+        self.log(f"compared with {path} (commit {baseline.get('meta', {}).get('commit')}):")
+        for route, result in results.items():
+            before = baseline.get("routes", {}).get(route)
+            if not before:
+                continue
+            old, new = before["latency_ms"]["p95"], result["latency_ms"]["p95"]
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change > threshold:
+                regressions.append(route)
+                flag = "  REGRESSION"
+            self.log(f"{route:>14}: p95 {old:.1f}ms -> {new:.1f}ms ({change:+.0%}){flag}")
+        return regressions
+
+    def cleanup(self):
+        Booking.objects.filter(check_in__gte=BOOK_FROM).delete()
+        User.objects.filter(email__startswith=REGISTER_PREFIX).delete()
+
+    def log(self, message):
+        # Progress goes to stderr so stdout stays valid JSON
+        self.stderr.write(message)
@@ -0,0 +1,224 @@
+import asyncio
+import io
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.contrib import admin
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import URLPattern, include, path
+
+from testapp import urls as app_urls
+from testapp import views
+from testapp.models import Room, User
+from testapp.services.auth_services import get_tokens_for_user
+
+
+BENCH_EMAIL = "bench-asgi@example.com"
+
+# url name -> (sync view, async view)
+READ_VIEWS = {
+    "list_rooms": (views.ListAPIView.as_view(), views.AsyncListAPIView.as_view()),
+    "retrieve_room": (views.RetrieveAPIView.as_view(), views.AsyncRetrieveAPIView.as_view()),
+    "Search_filter": (views.FilterAPIView.as_view(), views.AsyncFilterAPIView.as_view()),
+    "room_listing": (views.room_listing, views.async_room_listing),
+    "room_details": (views.room_details, views.async_room_details),
+}
+
+
+def urlconf(asynchronous):
+    """The project's URLs with the read views swapped for one flavour, whatever ASYNC_READ_VIEWS says."""
+    patterns = [
+        URLPattern(pattern.pattern, READ_VIEWS[pattern.name][asynchronous], pattern.default_args, pattern.name)
+        if pattern.name in READ_VIEWS else pattern
+        for pattern in app_urls.urlpatterns
+    ]
+    return type("BenchURLConf", (), {"urlpatterns": [path("admin/", admin.site.urls), path("", include(patterns))]})
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the read path served as WSGI (sync views on a fixed thread pool, like gunicorn --threads) "
+        "with ASGI (async views on one event loop, like uvicorn) at rising concurrency. Requests go through "
+        "the real WSGIHandler / ASGIHandler and the full middleware stack, in process, without sockets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", default="1,8,32,128", help="Comma-separated in-flight request levels")
+        parser.add_argument("--requests", type=int, default=400, help="Requests per level and server")
+        parser.add_argument("--wsgi-threads", type=int, default=8, help="Worker threads of the WSGI server")
+        parser.add_argument(
+            "--db-latency", type=float, default=0.0,
+            help="Milliseconds added to every query, to stand in for a database across the network",
+        )
+        parser.add_argument("--paths", default=None, help="Space-separated paths to request instead of the default mix")
+        parser.add_argument("--output", default=None, help="Write the JSON report here as well")
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options["concurrency"].split(",") if level.strip()]
+        room_ids = list(Room.objects.order_by("id").values_list("id", flat=True)[:200])
+        if not room_ids:
+            raise CommandError("No rooms in the database, seed some first (e.g. bench_api)")
+        user, created = User.objects.get_or_create(email=BENCH_EMAIL, defaults={"name": "bench", "tc": True})
+        self.token = get_tokens_for_user(user)["access"]
+        self.targets = [
+            "/rooms/api/", "/rooms/api/?fields=id,title,price", f"/rooms/api/{room_ids[0]}/",
+            "/search/?location=Pune", "/search/?sort=rating", "/rooms/", "/rooms/?search=flat",
+        ] + [f"/room_details/{room_id}/" for room_id in room_ids[:20]]
+        if options["paths"]:
+            self.targets = options["paths"].split()
+
+        report = {"wsgi_threads": options["wsgi_threads"], "db_latency_ms": options["db_latency"], "levels": {}}
+        if options["db_latency"]:
+            self.delay = options["db_latency"] / 1000
+            connection_created.connect(self.add_latency)
+            for conn in connections.all(initialized_only=True):
+                self.add_latency(None, conn)
+        try:
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=["localhost"], SQL_REPEAT_ACTION=None):
+                # Warm caches, the search index and the URL resolvers for both flavours
+                with override_settings(ROOT_URLCONF=urlconf(False)):
+                    self.run_wsgi(len(self.targets), 1, 1)
+                with override_settings(ROOT_URLCONF=urlconf(True)):
+                    asyncio.run(self.run_asgi(len(self.targets), 1))
+
+                for level in levels:
+                    with override_settings(ROOT_URLCONF=urlconf(False)):
+                        wsgi = self.run_wsgi(options["requests"], level, options["wsgi_threads"])
+                    with override_settings(ROOT_URLCONF=urlconf(True)):
+                        asgi = asyncio.run(self.run_asgi(options["requests"], level))
+                    report["levels"][level] = {"wsgi": wsgi, "asgi": asgi}
+                    for name, result in (("wsgi", wsgi), ("asgi", asgi)):
+                        self.stderr.write(
+                            f"c={level:<4} {name}: {result['rps']:>7.1f} req/s  p50 {result['p50_ms']:>7.1f} ms  "
+                            f"p95 {result['p95_ms']:>7.1f} ms  peak threads {result['peak_threads']:>3}  "
+                            f"errors {result['errors']}"
+                        )
+        finally:
+            connection_created.disconnect(self.add_latency)
+            if created:
+                user.delete()
+
+        text = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(text + "\n")
+        self.stdout.write(text)
+
+    def add_latency(self, sender, connection, **kwargs):
+        # Connections are per thread, so every new one gets the delay as it opens. Outermost,
+        # because execute_wrapper() blocks that are already open pop the last entry on exit
+        def delayed(execute, sql, params, many, context):
+            time.sleep(self.delay)
+            return execute(sql, params, many, context)
+        connection.execute_wrappers.insert(0, delayed)
+
+    def target(self, index):
+        return self.targets[index % len(self.targets)]
+
+    def summarize(self, timings, errors, elapsed, peak_threads):
+        timings.sort()
+        return {
+            "requests": len(timings),
+            "rps": round(len(timings) / elapsed, 1),
+            "p50_ms": round(statistics.median(timings) * 1000, 1),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1] * 1000, 1),
+            "errors": errors,
+            "peak_threads": peak_threads,
+        }
+
+    # ---- WSGI: sync views, a fixed pool of server threads ------------------
+
+    def run_wsgi(self, requests, concurrency, threads):
+        handler = WSGIHandler()
+        slots = threading.Semaphore(concurrency)
+        timings, errors, peak = [], [0], [threading.active_count()]
+
+        def call(url, queued_at):
+            try:
+                status = self.wsgi_request(handler, url)
+                if status >= 400:
+                    errors[0] += 1
+                timings.append(time.perf_counter() - queued_at)  # includes waiting for a free thread
+                peak[0] = max(peak[0], threading.active_count())
+            finally:
+                slots.release()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for index in range(requests):
+                slots.acquire()
+                pool.submit(call, self.target(index), time.perf_counter())
+        return self.summarize(timings, errors[0], time.perf_counter() - started, peak[0])
+
+    def wsgi_request(self, handler, url):
+        parts = urlsplit(url)
+        environ = {
+            "REQUEST_METHOD": "GET", "PATH_INFO": parts.path, "QUERY_STRING": parts.query,
+            "SERVER_NAME": "localhost", "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": "localhost", "HTTP_AUTHORIZATION": f"Bearer {self.token}",
+            "wsgi.input": io.BytesIO(b""), "wsgi.errors": io.StringIO(), "wsgi.url_scheme": "http",
+            "wsgi.version": (1, 0), "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+        }
+        status = []
+        response = handler(environ, lambda code, headers, exc_info=None: status.append(int(code.split()[0])))
+        for _ in response:
+            pass
+        response.close()
+        return status[0]
+
+    # ---- ASGI: async views, one event loop ---------------------------------
+
+    async def run_asgi(self, requests, concurrency):
+        handler = ASGIHandler()
+        queue = iter(range(requests))
+        timings, errors, peak = [], [0], [threading.active_count()]
+
+        async def client():
+            for index in queue:
+                started = time.perf_counter()
+                status = await self.asgi_request(handler, self.target(index))
+                if status >= 400:
+                    errors[0] += 1
+                timings.append(time.perf_counter() - started)
+                peak[0] = max(peak[0], threading.active_count())
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return self.summarize(timings, errors[0], time.perf_counter() - started, peak[0])
+
+    async def asgi_request(self, handler, url):
+        parts = urlsplit(url)
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": parts.path, "raw_path": parts.path.encode(), "query_string": parts.query.encode(),
+            "root_path": "", "server": ("localhost", 80), "client": ("127.0.0.1", 50000),
+            "headers": [(b"host", b"localhost"), (b"authorization", f"Bearer {self.token}".encode())],
+        }
+        status, body_sent, disconnected = [], [], asyncio.Event()
+
+        async def receive():
+            if not body_sent:
+                body_sent.append(True)
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # Like a server whose client stays connected until the response is done
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        try:
+            await handler(scope, receive, send)
+        finally:
+            disconnected.set()
+        return status[0]
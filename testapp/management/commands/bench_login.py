@@ -0,0 +1,69 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from testapp.models import User
+from testapp.services.auth_services import login_user
+
+
+BENCH_EMAIL = "bench-login@example.com"
+BENCH_PASSWORD = "bench-login-password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a login through the in-process auth service against the old HTTP loopback "
+        "to user_login/api/ (needs a running server at --base-url sharing this database)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=20)
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="Server used for the loopback timing")
+        parser.add_argument("--skip-loopback", action="store_true", help="Only time the in-process service")
+
+    def handle(self, *args, **options):
+        user, created = User.objects.get_or_create(email=BENCH_EMAIL, defaults={"name": "bench", "tc": True})
+        if created:
+            user.set_password(BENCH_PASSWORD)
+            user.save()
+
+        try:
+            results = {"in-process": self.time(options["runs"], lambda: login_user(BENCH_EMAIL, BENCH_PASSWORD))}
+            if not options["skip_loopback"]:
+                results["http loopback"] = self.time(options["runs"], lambda: self.loopback(options["base_url"]))
+        finally:
+            if created:
+                user.delete()
+
+        for name, timings in results.items():
+            self.stdout.write(
+                f"{name:>14}: p50={statistics.median(timings):.1f}ms "
+                f"mean={statistics.mean(timings):.1f}ms max={max(timings):.1f}ms"
+            )
+        if len(results) == 2:
+            saved = statistics.median(results["http loopback"]) - statistics.median(results["in-process"])
+            self.stdout.write(self.style.SUCCESS(f"latency saved per login (p50): {saved:.1f}ms"))
+
+    def time(self, runs, call):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def loopback(self, base_url):
+        # What the template login view used to do on every form submit
+        import requests
+
+        try:
+            response = requests.post(
+                f"{base_url.rstrip('/')}/user_login/api/",
+                json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD},
+                timeout=30,
+            )
+        except requests.exceptions.RequestException as e:
+            raise CommandError(f"Loopback server not reachable at {base_url}: {e}")
+        if response.status_code != 200:
+            raise CommandError(f"Loopback login failed with {response.status_code}: {response.text[:200]}")
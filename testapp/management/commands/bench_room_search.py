@@ -0,0 +1,122 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from testapp.models import Room, normalize_location
+
+
+LOCATIONS = [
+    "Delhi", "New Delhi", "Mumbai", "Navi Mumbai", "Pune", "Bengaluru", "Hyderabad", "Chennai",
+    "Kolkata", "Jaipur", "Lucknow", "Kanpur", "Nagpur", "Indore", "Bhopal", "Patna", "Surat",
+    "Vadodara", "Ahmedabad", "Noida", "Gurugram", "Ghaziabad", "Faridabad", "Agra", "Varanasi",
+    "Srinagar", "Amritsar", "Chandigarh", "Dehradun", "Shimla", "Goa", "Kochi", "Mysuru",
+    "Coimbatore", "Madurai", "Visakhapatnam", "Vijayawada", "Ranchi", "Raipur", "Guwahati",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database with rooms and compare the old icontains room search "
+        "against the indexed location key (query plans and latency)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=1_000_000, help="Target number of rooms in the table")
+        parser.add_argument("--seed", action="store_true", help="Insert rooms until the table holds --rooms rows")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query")
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--allow-non-sqlite", action="store_true",
+            help="Seed even when --database isn't SQLite (it gets up to --rooms bench rows)",
+        )
+
+    def handle(self, *args, **options):
+        db = options["database"]
+        connection = connections[db]
+        if options["seed"] and connection.vendor != "sqlite" and not options["allow_non_sqlite"]:
+            raise CommandError(
+                f"Refusing to seed the {connection.vendor} database {connection.settings_dict['NAME']!r}. "
+                "Point --database at a scratch SQLite file, or pass --allow-non-sqlite "
+                "if this database is meant to receive bench rows."
+            )
+        if options["seed"]:
+            self.seed(db, options["rooms"])
+
+        total = Room.objects.using(db).count()
+        self.stdout.write(f"rooms in table: {total}")
+
+        # Seeded locations are Zipf-distributed: "delhi" is common, "guwahati" is rare
+        scenarios = [
+            ("popular location", {"location": "delhi"}),
+            ("rare location", {"location": "guwahati"}),
+            ("rare location + price", {"location": "guwahati", "price_min": 2000, "price_max": 6000}),
+            ("popular location + price + available", {"location": "New  Delhi", "price_min": 2000, "price_max": 6000, "available": True}),
+        ]
+        for name, params in scenarios:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {name} {params}"))
+            before = self.build(db, params, indexed=False)
+            after = self.build(db, params, indexed=True)
+            for label, qs in (("before (icontains)", before), ("after (location_key)", after)):
+                self.stdout.write(f"-- {label}")
+                self.stdout.write(qs.explain())
+                self.report(label, lambda: list(qs[:options["page_size"] + 1]), options["repeat"], "first page")
+                self.report(label, qs.count, options["repeat"], "count")
+
+    def build(self, db, params, indexed):
+        qs = Room.objects.using(db)
+        if "price_min" in params:
+            qs = qs.filter(price__gte=params["price_min"])
+        if "price_max" in params:
+            qs = qs.filter(price__lte=params["price_max"])
+        if indexed:
+            qs = qs.in_location(params["location"])
+        else:
+            qs = qs.filter(location__icontains=params["location"])
+        if "available" in params:
+            qs = qs.filter(availability=params["available"])
+        return qs.order_by("price", "id")
+
+    def report(self, label, run, repeat, what):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{label} {what}: p50={statistics.median(timings):.2f}ms p95={p95:.2f}ms "
+            f"min={timings[0]:.2f}ms over {repeat} runs"
+        )
+
+    def seed(self, db, target):
+        existing = Room.objects.using(db).count()
+        missing = target - existing
+        if missing <= 0:
+            return
+        self.stdout.write(f"seeding {missing} rooms...")
+        rng = random.Random(42)
+        weights = [1 / (rank + 1) ** 1.5 for rank in range(len(LOCATIONS))]
+        batch_size = 5000
+        started = time.perf_counter()
+        for offset in range(0, missing, batch_size):
+            batch = []
+            for _ in range(min(batch_size, missing - offset)):
+                location = rng.choices(LOCATIONS, weights)[0]
+                batch.append(Room(
+                    image="room_images/home1.jpg",
+                    title=f"Bench room in {location}",
+                    price=Decimal(rng.randrange(500, 20000)),
+                    location=location,
+                    location_key=normalize_location(location),
+                    availability=rng.random() < 0.7,
+                    description="Seeded for the search benchmark.",
+                ))
+            Room.objects.using(db).bulk_create(batch)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"seeded {missing} rooms in {elapsed:.1f}s")
@@ -0,0 +1,53 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from testapp.models import Room
+from testapp.serializers.fast_serializers import RoomValuesSerializer
+from testapp.serializers.room_serializers import RoomSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark: serialize the same rooms with RoomSerializer (model instances) and "
+        "RoomValuesSerializer (values_list tuples), check the rendered JSON is identical and report timings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=1000, help="Rooms per run (one large page)")
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--fields", default=None, help="Comma-separated sparse fieldset, e.g. id,title,price")
+
+    def handle(self, *args, **options):
+        fields = options["fields"].split(",") if options["fields"] else None
+        rooms = Room.objects.order_by("id")[:options["rooms"]]
+        renderer = JSONRenderer()
+
+        def model_path():
+            return renderer.render(RoomSerializer(list(rooms), many=True, fields=fields).data)
+
+        def values_path():
+            serializer = RoomValuesSerializer(fields=fields)
+            return renderer.render(serializer.serialize(list(serializer.values(rooms))))
+
+        if model_path() != values_path():
+            raise CommandError("RoomValuesSerializer output differs from RoomSerializer")
+        count = len(rooms)
+        self.stdout.write(f"{count} rooms, fields={fields or 'all'}, outputs identical")
+
+        results = {}
+        for label, run in (("RoomSerializer", model_path), ("RoomValuesSerializer", values_path)):
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = statistics.median(timings)
+            self.stdout.write(
+                f"{label:22} median {results[label]:8.1f} ms  ({count / results[label] * 1000:,.0f} rooms/s, query + render)"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"speedup x{results['RoomSerializer'] / results['RoomValuesSerializer']:.1f}"
+        ))
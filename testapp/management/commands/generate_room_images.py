@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+
+from testapp.images import apply_variants, generate_variants
+from testapp.models import Room
+
+
+def _setup_worker():
+    # Needed when the pool spawns fresh interpreters instead of forking
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = "Backfill resized JPEG/WebP variants for room images using a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+        parser.add_argument("--force", action="store_true", help="Rebuild variants that already exist")
+
+    def handle(self, *args, **options):
+        # Many rooms share one original, so each file is processed once
+        pending = set()
+        rows = Room.objects.exclude(image="").values_list("image", "image_variants")
+        for name, variants in rows.iterator(chunk_size=2000):
+            if options["force"] or (variants or {}).get("source") != name:
+                pending.add(name)
+
+        if not pending:
+            self.stdout.write("All room images already have variants.")
+            return
+
+        self.stdout.write(f"Building variants for {len(pending)} images...")
+        started = time.perf_counter()
+        done = failed = rooms = 0
+        with ProcessPoolExecutor(max_workers=options["workers"], initializer=_setup_worker) as pool:
+            futures = {pool.submit(generate_variants, name): name for name in sorted(pending)}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{name}: {exc}")
+                    continue
+                rooms += apply_variants(result)
+                done += 1
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{done} images processed, {failed} failed, {rooms} rooms updated in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,168 @@
+import csv
+import json
+import os
+import time
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework import serializers
+
+from testapp.models import Room, normalize_location
+from testapp.serializers.room_serializers import RoomSerializer
+
+
+class RoomImportSerializer(RoomSerializer):
+    # Same rules as the API, except the image is a path we resolve ourselves
+    image = serializers.CharField(max_length=100)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream rooms from a CSV or JSONL file into the database in bulk_create batches. "
+        "Rows are validated with RoomSerializer rules; --resume continues after the last committed batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV (with a header row) or JSONL file")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Default: from the file extension")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk_create / transaction")
+        parser.add_argument("--image-root", default=None, help="Directory relative image paths are resolved against")
+        parser.add_argument("--errors", default=None, help="Write rejected rows here as JSONL (default: <path>.errors.jsonl)")
+        parser.add_argument("--resume", action="store_true", help="Skip rows committed by a previous run")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist")
+        fmt = options["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+        self.image_root = options["image_root"] or os.path.dirname(os.path.abspath(path))
+        self.resolved_images = {}
+        # One serializer for every row: building its fields is most of the cost of validation
+        self.serializer = RoomImportSerializer()
+
+        checkpoint_path = f"{path}.progress"
+        skip, errors_offset = self.read_checkpoint(checkpoint_path) if options["resume"] else (0, 0)
+        if skip:
+            self.stdout.write(f"Resuming after row {skip}")
+
+        errors_path = options["errors"] or f"{path}.errors.jsonl"
+        batch, imported, rejected, row_number = [], 0, 0, 0
+        started = time.perf_counter()
+
+        with open(errors_path, "a" if skip else "w") as errors_file:
+            # Rows after the checkpoint are read again: drop what the interrupted run logged for them
+            errors_file.truncate(min(errors_offset, errors_file.tell()))
+            for row_number, row in enumerate(self.read_rows(path, fmt), start=1):
+                if row_number <= skip:
+                    continue
+                room, errors = self.build_room(row)
+                if errors:
+                    rejected += 1
+                    errors_file.write(json.dumps({"row": row_number, "errors": errors}, default=str) + "\n")
+                    continue
+                batch.append(room)
+
+                if len(batch) >= options["batch_size"]:
+                    imported += self.flush(batch, checkpoint_path, row_number, errors_file)
+                    batch = []
+                    self.progress(row_number - skip, imported, rejected, started)
+
+            imported += self.flush(batch, checkpoint_path, row_number, errors_file)
+
+        elapsed = time.perf_counter() - started
+        rate = (row_number - skip) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {imported} rooms imported, {rejected} rejected in {elapsed:.1f}s ({rate:.0f} rows/s)"
+        ))
+        if rejected:
+            self.stdout.write(f"Rejected rows are listed in {errors_path}")
+        self.stdout.write(
+            "bulk_create skips model signals: run `rebuild_search_index` and `generate_room_images` next."
+        )
+
+    def read_rows(self, path, fmt):
+        with open(path, newline="", encoding="utf-8") as handle:
+            if fmt == "csv":
+                yield from csv.DictReader(handle)
+            else:
+                for line in handle:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+
+    def build_room(self, row):
+        try:
+            data = self.serializer.run_validation(row)
+        except serializers.ValidationError as e:
+            return None, e.detail
+        try:
+            self.image_source(data["image"])
+        except OSError as e:
+            return None, {"image": [str(e)]}
+        # bulk_create bypasses Room.save(), so fill the derived column here
+        return Room(location_key=normalize_location(data["location"]), **data), None
+
+    def image_source(self, value):
+        """File an image is copied in from (under --image-root unless absolute), or None when already in storage."""
+        if value in self.resolved_images or default_storage.exists(value):
+            return None
+        source = value if os.path.isabs(value) else os.path.join(self.image_root, value)
+        if not os.path.isfile(source):
+            raise FileNotFoundError(f"No such file: {source}")
+        return source
+
+    def resolve_image(self, value, copied):
+        """Storage name for an image, copying it in if needed; copies are recorded in `copied`."""
+        if value in self.resolved_images:
+            return self.resolved_images[value]
+        source = self.image_source(value)
+        if source is None:
+            name = value
+        else:
+            with open(source, "rb") as handle:
+                name = default_storage.save(f"room_images/{os.path.basename(source)}", File(handle))
+            copied.append((value, name))
+        self.resolved_images[value] = name
+        return name
+
+    def flush(self, batch, checkpoint_path, row_number, errors_file):
+        # One bounded transaction per batch; the checkpoint only moves once it has committed.
+        # Images are copied in right before it and deleted again if it fails, so no orphans.
+        copied = []
+        try:
+            for room in batch:
+                room.image = self.resolve_image(room.image.name, copied)
+            with transaction.atomic():
+                Room.objects.bulk_create(batch)
+        except BaseException:
+            for value, name in copied:
+                default_storage.delete(name)
+                del self.resolved_images[value]
+            raise
+        errors_file.flush()
+        self.write_checkpoint(checkpoint_path, row_number, errors_file.tell())
+        return len(batch)
+
+    def progress(self, processed, imported, rejected, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{processed} rows read, {imported} imported, {rejected} rejected "
+            f"({processed / elapsed:.0f} rows/s)"
+        )
+
+    def read_checkpoint(self, checkpoint_path):
+        """(last committed row, size of the errors file at that point)."""
+        try:
+            with open(checkpoint_path) as handle:
+                checkpoint = json.load(handle)
+        except FileNotFoundError:
+            return 0, 0
+        return checkpoint["row"], checkpoint["errors_offset"]
+
+    def write_checkpoint(self, checkpoint_path, row_number, errors_offset):
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump({"row": row_number, "errors_offset": errors_offset}, handle)
+        os.replace(tmp_path, checkpoint_path)
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from testapp.cache import room_cache
+from testapp.models import Review, Room
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Room.rating_avg / rating_count from the reviews table and fix rooms that drifted "
+        "(e.g. after a bulk review update that skipped the signals). Walks rooms in id batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000, help="Rooms checked per query")
+        parser.add_argument("--dry-run", action="store_true", help="Report drifted rooms without writing")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        checked = fixed = 0
+        last_id = 0
+        started = time.perf_counter()
+
+        while True:
+            rooms = list(
+                Room.objects.filter(id__gt=last_id).order_by("id")
+                .values_list("id", "rating_avg", "rating_count")[:batch_size]
+            )
+            if not rooms:
+                break
+            first_id, last_id = rooms[0][0], rooms[-1][0]
+            actual = {
+                row["room_id"]: (row["avg"], row["count"])
+                for row in Review.objects.filter(room_id__gte=first_id, room_id__lte=last_id)
+                .values("room_id").annotate(avg=Avg("rating"), count=Count("id"))
+            }
+
+            drifted = []
+            for room_id, stored_avg, stored_count in rooms:
+                avg, count = actual.get(room_id, (0.0, 0))
+                if count != stored_count or abs(avg - stored_avg) > 1e-6:
+                    drifted.append(room_id)
+            checked += len(rooms)
+            fixed += len(drifted)
+
+            if drifted and not options["dry_run"]:
+                with transaction.atomic():
+                    self.recompute(drifted)
+                    for room_id in drifted:
+                        transaction.on_commit(lambda room_id=room_id: room_cache.invalidate(room_id))
+
+        elapsed = time.perf_counter() - started
+        action = "would fix" if options["dry_run"] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} rooms, {action} {fixed} in {elapsed:.1f}s"))
+
+    def recompute(self, room_ids):
+        # One set-based UPDATE (bulk_update's CASE per row is quadratic in the batch).
+        # Aggregates are read at write time, so reviews added since the check count too.
+        reviews = Review.objects.filter(room=OuterRef("pk")).values("room")
+        Room.objects.filter(pk__in=room_ids).update(
+            rating_avg=Coalesce(Subquery(reviews.annotate(avg=Avg("rating")).values("avg")), Value(0.0), output_field=FloatField()),
+            rating_count=Coalesce(Subquery(reviews.annotate(count=Count("id")).values("count")), Value(0), output_field=IntegerField()),
+            updated_at=timezone.now(),
+        )
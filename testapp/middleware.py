@@ -0,0 +1,334 @@
+import hashlib
+import logging
+import re
+import time
+import warnings
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import routers
+from .authentication import CachedJWTAuthentication
+from .tokens import TokenRefreshSerializer
+
+
+logger = logging.getLogger("testapp.sql")
+
+
+class RepeatedQueryError(AssertionError):
+    """The same query shape ran more times in one request than SQL_REPEAT_THRESHOLD allows."""
+
+
+class RepeatedQueryWarning(UserWarning):
+    pass
+
+
+IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*%s\s*,?)+\)", re.IGNORECASE)
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Query shape: literals and IN lists of any length collapse, so a loop of lookups shows up as one shape."""
+    sql = IN_LIST_RE.sub("IN (...)", sql)
+    sql = STRING_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # seconds
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook: time every statement on its way to the driver
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[fingerprint(sql)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Counts and times the queries each request runs on every database alias.
+    Adds a Server-Timing header (db and app durations) and logs one line per
+    request to the "testapp.sql" logger. When a query shape repeats more than
+    SQL_REPEAT_THRESHOLD times, SQL_REPEAT_ACTION decides what happens:
+    "warn", "raise" (meant for DEBUG and tests) or None to only log it.
+    Queries run while a streaming response is consumed are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "SQL_INSTRUMENTATION", True)
+        self.threshold = getattr(settings, "SQL_REPEAT_THRESHOLD", 10)
+        self.action = getattr(settings, "SQL_REPEAT_ACTION", None)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def wrap_connections(self, stack, stats):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        stats = QueryStats()
+        request.sql_stats = stats
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            self.wrap_connections(stack, stats)
+            response = self.get_response(request)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        stats = QueryStats()
+        request.sql_stats = stats
+        started = time.perf_counter()
+        # Connections are per thread: the async ORM runs a request's queries on the
+        # thread its sync_to_async calls share, so the wrappers have to go there too
+        stack = ExitStack()
+        await sync_to_async(self.wrap_connections)(stack, stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    def finish(self, request, response, stats, elapsed):
+        repeated = stats.repeated(self.threshold)
+        self.add_server_timing(response, stats, elapsed)
+        self.log(request, response, stats, elapsed, repeated)
+        if repeated:
+            self.report_repeated(request, repeated)
+        return response
+
+    def add_server_timing(self, response, stats, elapsed):
+        queries = "1 query" if stats.count == 1 else f"{stats.count} queries"
+        timing = f'db;dur={stats.duration * 1000:.1f};desc="{queries}", app;dur={elapsed * 1000:.1f}'
+        existing = response.get("Server-Timing")
+        response["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+
+    def log(self, request, response, stats, elapsed, repeated):
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": stats.count,
+            "db_ms": round(stats.duration * 1000, 1),
+            "total_ms": round(elapsed * 1000, 1),
+            "repeated": len(repeated),
+        }
+        message = " ".join(f"{key}={value}" for key, value in fields.items())
+        level = logging.WARNING if repeated else logging.INFO
+        logger.log(level, message, extra={"sql": {**fields, "top_shapes": stats.shapes.most_common(3)}})
+
+    def report_repeated(self, request, repeated):
+        shape, count = repeated[0]
+        message = (
+            f"{request.method} {request.path} ran the same query {count} times "
+            f"(threshold {self.threshold}), likely an N+1: {shape[:300]}"
+        )
+        if self.action == "raise":
+            raise RepeatedQueryError(message)
+        if self.action == "warn":
+            warnings.warn(message, RepeatedQueryWarning, stacklevel=2)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Keeps a client on the primary database for DATABASE_READ_YOUR_WRITES_SECONDS
+    after it wrote, so it never reads a replica that hasn't caught up with its
+    own change (see testapp/routers.py). The pin travels in a cookie, and for
+    API clients that drop cookies also in the cache under their Authorization
+    header. Requests without a recent write read from the replicas.
+    """
+
+    cookie_name = "primary_until"
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def pin_key(self, request):
+        authorization = request.META.get("HTTP_AUTHORIZATION")
+        if authorization:
+            return "db-pin:" + hashlib.sha256(authorization.encode()).hexdigest()
+        return None
+
+    def start(self, request):
+        routers.unpin()
+        now = time.time()
+        try:
+            until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            until = 0.0
+        key = self.pin_key(request)
+        if key:
+            until = max(until, cache.get(key, 0.0))
+        # Never trust a pin longer than the window, the cookie is client-controlled
+        routers.pin(min(until, now + routers.sticky_window()))
+
+    def finish(self, request, response):
+        if routers.wrote():
+            until = routers.pinned_until()
+            window = routers.sticky_window()
+            response.set_cookie(self.cookie_name, f"{until:.3f}", max_age=window, httponly=True, samesite="Lax")
+            key = self.pin_key(request)
+            if key:
+                cache.set(key, until, window)
+        routers.unpin()
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.start(request)
+        return self.finish(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        self.start(request)
+        return self.finish(request, await self.get_response(request))
+
+
+class JWTSessionMiddleware:
+    """
+    Authenticates template pages from the access token the login page keeps in
+    the session. The token is checked locally (signature and expiry) and its
+    user comes from the authentication user cache, so a page view costs no
+    user query, and no session query either once sessions use cached_db on
+    a shared cache (see SESSION_ENGINE).
+    An expired access token is exchanged for a new pair with the refresh
+    token and written back to the session. Nothing happens until the view
+    or a template reads request.user. Without a token the session user from
+    AuthenticationMiddleware (e.g. the admin's) is used.
+    """
+
+    # Concurrent page loads share one refresh instead of each rotating the same token
+    refresh_grace = 30
+    # A page load that lost the refresh to another worker waits this long for its session save
+    reload_attempts = 3
+    reload_interval = 0.1
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.authentication = CachedJWTAuthentication()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # Only installs the lazy user, so the same call serves sync and async stacks
+        self.install(request)
+        return self.get_response(request)
+
+    def install(self, request):
+        session_user = getattr(request, "user", None)
+
+        def get_user():
+            if not hasattr(request, "_jwt_session_user"):
+                request._jwt_session_user = self.resolve(request, session_user)
+            return request._jwt_session_user
+
+        async def auser():
+            return await sync_to_async(get_user)()
+
+        request.user = SimpleLazyObject(get_user)
+        request.auser = auser
+
+    def resolve(self, request, session_user):
+        access = request.session.get("access_token")
+        if not access:
+            return session_user if session_user is not None else AnonymousUser()
+        try:
+            token = AccessToken(access)
+        except TokenError:
+            token = self.refresh(request)
+        if token is not None:
+            try:
+                return self.authentication.get_user(token)
+            except (AuthenticationFailed, TokenError):
+                pass
+        # Expired for good, revoked, or the user is gone: the page is anonymous from now on
+        for key in ("access_token", "refresh_token", "is_admin"):
+            request.session.pop(key, None)
+        return AnonymousUser()
+
+    def refresh(self, request):
+        refresh = request.session.get("refresh_token")
+        if not refresh:
+            return None
+        key = "jwt-session-refresh:" + hashlib.sha256(refresh.encode()).hexdigest()
+        tokens = cache.get(key)
+        if tokens is None:
+            serializer = TokenRefreshSerializer(data={"refresh": refresh})
+            try:
+                serializer.is_valid(raise_exception=True)
+            except (AuthenticationFailed, TokenError, ValidationError):
+                # Lost a race with another page load of this session: use what it got, from
+                # the cache, or from the session row when it ran in another process
+                tokens = cache.get(key) or self.saved_tokens(request, refresh)
+                if tokens is None:
+                    return None
+            else:
+                tokens = serializer.validated_data
+                cache.set(key, tokens, self.refresh_grace)
+
+        request.session["access_token"] = tokens["access"]
+        request.session["refresh_token"] = tokens.get("refresh", refresh)
+        return AccessToken(tokens["access"])
+
+    def saved_tokens(self, request, refresh):
+        """The pair another request saved to this session after rotating `refresh`, read from the primary."""
+        session_key = request.session.session_key
+        if session_key is None:
+            return None
+        for attempt in range(self.reload_attempts):
+            if attempt:
+                time.sleep(self.reload_interval)
+            row = Session.objects.using(routers.PRIMARY).filter(session_key=session_key, expire_date__gt=timezone.now()).first()
+            if row is None:
+                return None  # signed out meanwhile
+            stored = row.get_decoded()
+            if stored.get("refresh_token") not in (None, refresh):
+                try:
+                    AccessToken(stored.get("access_token"))
+                except TokenError:
+                    return None
+                return {"access": stored["access_token"], "refresh": stored["refresh_token"]}
+        return None
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+def fill_location_key(apps, schema_editor):
+    Room = apps.get_model('testapp', 'Room')
+    batch = []
+    for room in Room.objects.only('id', 'location').iterator(chunk_size=2000):
+        room.location_key = " ".join((room.location or "").split()).lower()
+        batch.append(room)
+        if len(batch) >= 2000:
+            Room.objects.bulk_update(batch, ['location_key'])
+            batch = []
+    if batch:
+        Room.objects.bulk_update(batch, ['location_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0002_user_is_superuser'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='location_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_location_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['price', 'id'], name='room_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['location_key', 'price', 'id'], name='room_loc_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['location_key', 'availability', 'price', 'id'], name='room_loc_avail_price_idx'),
+        ),
+    ]
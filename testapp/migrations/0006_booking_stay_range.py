@@ -0,0 +1,53 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:20
+
+import datetime
+
+from django.db import migrations, models
+
+
+def fill_stay_range(apps, schema_editor):
+    # Existing bookings become one-night stays starting on their booking date
+    Booking = apps.get_model('testapp', 'Booking')
+    for booking in Booking.objects.all().iterator(chunk_size=2000):
+        booking.check_in = booking.booking_date.date()
+        booking.check_out = booking.check_in + datetime.timedelta(days=1)
+        booking.save(update_fields=['check_in', 'check_out'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0005_room_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='check_in',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='check_out',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(fill_stay_range, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='check_in',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='check_out',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['room', 'check_in', 'check_out'], name='booking_room_stay_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.CheckConstraint(condition=models.Q(('check_out__gt', models.F('check_in'))), name='booking_check_out_after_check_in'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0006_booking_stay_range'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='request_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(fields=('user', 'request_key'), name='booking_unique_user_request_key'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:29
+
+from django.db import migrations, models
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    Room = apps.get_model('testapp', 'Room')
+    Review = apps.get_model('testapp', 'Review')
+    stats = Review.objects.values('room_id').annotate(avg=models.Avg('rating'), count=models.Count('id'))
+    batch = []
+    for row in stats.iterator(chunk_size=2000):
+        batch.append(Room(pk=row['room_id'], rating_avg=row['avg'], rating_count=row['count']))
+        if len(batch) >= 2000:
+            Room.objects.bulk_update(batch, ['rating_avg', 'rating_count'])
+            batch = []
+    if batch:
+        Room.objects.bulk_update(batch, ['rating_avg', 'rating_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0007_booking_request_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='rating_avg',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['-rating_avg', 'id'], name='room_rating_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0008_room_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['room', '-created_at', '-id'], name='review_room_created_idx'),
+        ),
+    ]
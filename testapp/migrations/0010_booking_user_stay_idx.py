@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0009_review_room_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-check_in', '-id'], name='booking_user_stay_idx'),
+        ),
+    ]
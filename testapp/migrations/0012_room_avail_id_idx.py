@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0011_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['availability', '-id'], name='room_avail_id_idx'),
+        ),
+    ]
@@ -1,26 +1,191 @@
-from django.db import models
+from django.db import IntegrityError, connections, models, router, transaction
 from django.utils.timezone import now  # Import timezone
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser
 from django.conf import settings
 
+
+def normalize_location(value):
+    """Lowercase and collapse whitespace so "  New  Delhi" and "new delhi" share a key."""
+    return " ".join((value or "").split()).lower()
+
+
+class RoomQuerySet(models.QuerySet):
+    def in_location(self, location):
+        """
+        Rooms whose location contains `location`, ignoring case and extra
+        whitespace, so "delhi" also finds "New Delhi". The few distinct
+        location keys are matched here and the rooms are then read with
+        location_key IN (...), which the location_key indexes serve.
+        """
+        key = normalize_location(location)
+        if not key:
+            return self
+        return self.filter(location_key__in=[candidate for candidate in self.location_keys() if key in candidate])
+
+    def location_keys(self):
+        # DISTINCT over the indexed column: one entry per location, a loose index scan on MySQL
+        return self.model._default_manager.using(self.db).order_by().values_list('location_key', flat=True).distinct()
+
+    def available_between(self, check_in, check_out):
+        """Listed rooms with no booking overlapping the stay, as a single NOT EXISTS query."""
+        taken = Booking.objects.filter(room=models.OuterRef('pk')).overlapping(check_in, check_out)
+        return self.filter(availability=True).exclude(models.Exists(taken))
+
+    # Review aggregates are maintained in place with single UPDATEs, never by
+    # re-reading the reviews table. rating_avg is assigned before rating_count
+    # because MySQL evaluates SET clauses left to right against the new values.
+    def add_rating(self, room_id, rating):
+        return self.filter(pk=room_id).update(
+            rating_avg=(models.F('rating_avg') * models.F('rating_count') + rating) / (models.F('rating_count') + 1),
+            rating_count=models.F('rating_count') + 1,
+            updated_at=now(),
+        )
+
+    def remove_rating(self, room_id, rating):
+        return self.filter(pk=room_id, rating_count__gt=0).update(
+            rating_avg=models.Case(
+                models.When(rating_count=1, then=models.Value(0.0)),
+                default=(models.F('rating_avg') * models.F('rating_count') - rating) / (models.F('rating_count') - 1),
+            ),
+            rating_count=models.F('rating_count') - 1,
+            updated_at=now(),
+        )
+
+    def change_rating(self, room_id, old_rating, new_rating):
+        return self.filter(pk=room_id, rating_count__gt=0).update(
+            rating_avg=models.F('rating_avg') + float(new_rating - old_rating) / models.F('rating_count'),
+            updated_at=now(),
+        )
+
+
 # Room model
 class Room(models.Model):
     image = models.ImageField(upload_to='room_images/')  
     title = models.CharField(max_length=100)  
     price = models.DecimalField(max_digits=10, decimal_places=2) 
     location = models.CharField(max_length=100)
+    location_key = models.CharField(max_length=100, editable=False, default='')  # normalized copy of location for indexed search
     availability = models.BooleanField(default=True)
     description = models.TextField(max_length=500)  
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # drives ETag / Last-Modified
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # resized copies of image, see images.py
+    rating_avg = models.FloatField(default=0, editable=False)  # kept in step with reviews, see signals.py
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RoomQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination / price filters without a location
+            models.Index(fields=['price', 'id'], name='room_price_id_idx'),
+            # location (+ availability) searches, already in (price, id) order
+            models.Index(fields=['location_key', 'price', 'id'], name='room_loc_price_idx'),
+            models.Index(fields=['location_key', 'availability', 'price', 'id'], name='room_loc_avail_price_idx'),
+            # best rated first
+            models.Index(fields=['-rating_avg', 'id'], name='room_rating_id_idx'),
+            # admin changelist: newest first, filtered by availability
+            models.Index(fields=['availability', '-id'], name='room_avail_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.location_key = normalize_location(self.location)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            extra = {'updated_at'} | ({'location_key'} if 'location' in update_fields else set())
+            kwargs['update_fields'] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
 
+class BookingQuerySet(models.QuerySet):
+    def overlapping(self, check_in, check_out):
+        """Stays sharing at least one night with [check_in, check_out). Served by booking_room_stay_idx."""
+        return self.filter(check_in__lt=check_out, check_out__gt=check_in)
+
+    def book(self, user, room_id, check_in, check_out, request_key=None):
+        """
+        Create a stay if nothing overlaps it. The room row is locked first
+        (SELECT ... FOR UPDATE), so bookings of one room run one at a time and
+        the INSERT ... SELECT WHERE NOT EXISTS that follows sees every stay
+        committed before it, at any isolation level. Returns (booking, created):
+        (new booking, True), (earlier booking with the same request_key, False),
+        or (None, False) when the room is missing or taken. Skips save() signals.
+        """
+        db = self._db or router.db_for_write(self.model)
+        connection = connections[db]
+        qn = connection.ops.quote_name
+        booking = Booking(user=user, room_id=room_id, check_in=check_in, check_out=check_out, request_key=request_key)
+        fields = [Booking._meta.get_field(name) for name in ('user', 'room', 'booking_date', 'check_in', 'check_out', 'request_key')]
+        user_value, room_value, booked_at, stay_in, stay_out, key_value = [
+            field.get_db_prep_save(getattr(booking, field.attname), connection) for field in fields
+        ]
+
+        table, rooms = qn(Booking._meta.db_table), qn(Room._meta.db_table)
+        columns = ", ".join(qn(field.column) for field in fields)
+        sql = (
+            f"INSERT INTO {table} ({columns}) "
+            f"SELECT %s, r.{qn('id')}, %s, %s, %s, %s FROM {rooms} r "
+            f"WHERE r.{qn('id')} = %s AND NOT EXISTS ("
+            f"SELECT 1 FROM {table} b WHERE b.{qn('room_id')} = r.{qn('id')} "
+            f"AND b.{qn('check_in')} < %s AND b.{qn('check_out')} > %s)"
+        )
+        returning = connection.features.can_return_columns_from_insert
+        if returning:
+            sql += f" RETURNING {qn('id')}"
+        params = [user_value, booked_at, stay_in, stay_out, key_value, room_value, stay_out, stay_in]
+
+        try:
+            with transaction.atomic(using=db):
+                if not Room.objects.using(db).select_for_update().filter(pk=room_id).exists():
+                    return None, False
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    if returning:
+                        row = cursor.fetchone()
+                        booking.pk = row[0] if row else None
+                    else:
+                        booking.pk = cursor.lastrowid if cursor.rowcount else None
+        except IntegrityError:
+            if request_key is None:
+                raise
+            booking.pk = None
+
+        if booking.pk is None:
+            # Same user + request_key: this is a retry of a booking that already went through
+            if request_key is not None:
+                return self.using(db).filter(user=user, request_key=request_key).first(), False
+            return None, False
+        booking._state.adding = False
+        booking._state.db = db
+        return booking, True
+
+
 # Booking model
 class Booking(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='bookings')
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='bookings')
     booking_date = models.DateTimeField(default=now)  # Add default value here
+    check_in = models.DateField()  # first night
+    check_out = models.DateField()  # departure day, not a night of the stay
+    request_key = models.CharField(max_length=64, null=True, blank=True, editable=False)  # client idempotency key
+
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'check_in', 'check_out'], name='booking_room_stay_idx'),
+            # a user's bookings, latest stay first
+            models.Index(fields=['user', '-check_in', '-id'], name='booking_user_stay_idx'),
+            # admin changelist: newest stays first, filtered by check-in date
+            models.Index(fields=['-check_in', '-id'], name='booking_check_in_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(check_out__gt=models.F('check_in')), name='booking_check_out_after_check_in'),
+            # A retried request (double click, client retry) can never create a second row
+            models.UniqueConstraint(fields=['user', 'request_key'], name='booking_unique_user_request_key'),
+        ]
 
     def __str__(self):
         return f"Booking by {self.user.email} for {self.room.title}"
@@ -34,6 +199,19 @@ class Review(models.Model):
     comment = models.TextField(blank=True, null=True)  # Optional comment
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # a room's reviews newest first, seeked by cursor
+            models.Index(fields=['room', '-created_at', '-id'], name='review_room_created_idx'),
+            # admin changelist: newest first, filtered by date
+            models.Index(fields=['-created_at', '-id'], name='review_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The review row and its room's rating columns commit together
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Review, instance=self)):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Review by {self.user.email} for {self.room.title}"
 
@@ -0,0 +1,165 @@
+import base64
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# Cursors are opaque to clients: base64 of the ordering key of the boundary row
+def encode_cursor(key, reverse=False):
+    payload = json.dumps({"k": list(key), "r": int(reverse)}, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return payload["k"], bool(payload.get("r"))
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Invalid cursor")
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def query_string(self, params, cursor):
+        """Rebuild the current query string with `cursor` swapped in."""
+        query = {key: value for key, value in params.items() if key != "cursor"}
+        query["cursor"] = cursor
+        return urlencode(query)
+
+    def next_query(self, params):
+        return self.query_string(params, self.next_cursor) if self.has_next else None
+
+    def previous_query(self, params):
+        return self.query_string(params, self.previous_cursor) if self.has_previous else None
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination that seeks on the ordering key instead of using OFFSET,
+    so every page costs the same no matter how deep the client goes.
+    The last field of `ordering` must be unique (normally `id`); prefix a field
+    with "-" to walk it in descending order.
+    """
+
+    def __init__(self, ordering=("id",), page_size=None, max_page_size=None):
+        self.ordering = tuple(ordering)
+        self.fields = tuple(field.lstrip("-") for field in self.ordering)
+        self.page_size = page_size or getattr(settings, "ROOM_PAGE_SIZE", 20)
+        self.max_page_size = max_page_size or getattr(settings, "ROOM_MAX_PAGE_SIZE", 100)
+
+    def get_page_size(self, params):
+        try:
+            size = int(params.get("page_size", self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_key(self, row):
+        if isinstance(row, dict):
+            return tuple(row[field] for field in self.fields)
+        return tuple(getattr(row, field) for field in self.fields)
+
+    def seek(self, key, reverse):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y); descending fields flip the comparison
+        condition = Q()
+        for index, (ordered, field) in enumerate(zip(self.ordering, self.fields)):
+            lookup = "lt" if reverse != ordered.startswith("-") else "gt"
+            step = Q(**{f"{field}__{lookup}": key[index]})
+            for previous, value in zip(self.fields[:index], key[:index]):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def clean_key(self, model, key):
+        # The key comes from the client: coerce each part like its field would, so a
+        # tampered cursor is a 400 rather than an error inside the query
+        if not isinstance(key, list) or len(key) != len(self.ordering):
+            raise InvalidCursor("Invalid cursor")
+        try:
+            key = [model._meta.get_field(field).to_python(value) for field, value in zip(self.fields, key)]
+        except (ValidationError, ValueError, TypeError):
+            raise InvalidCursor("Invalid cursor")
+        if any(value is None for value in key):
+            raise InvalidCursor("Invalid cursor")
+        return key
+
+    def plan(self, queryset, params):
+        """Order and seek `queryset` for the requested page; returns the slice to fetch and the paging state."""
+        size = self.get_page_size(params)
+        cursor = params.get("cursor")
+        key, reverse = None, False
+        if cursor:
+            key, reverse = decode_cursor(cursor)
+            key = self.clean_key(queryset.model, key)
+
+        order = [field[1:] if field.startswith("-") else f"-{field}" for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*order)
+        if key is not None:
+            queryset = queryset.filter(self.seek(key, reverse))
+        return queryset[:size + 1], (size, key, reverse)
+
+    def page(self, rows, state, get_key):
+        size, key, reverse = state
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+
+        # Walking backwards, "more rows" means there is a previous page
+        has_next = key is not None if reverse else has_more
+        has_previous = has_more if reverse else key is not None
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(get_key(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor(get_key(rows[0]), reverse=True)
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    def paginate(self, queryset, params, key=None):
+        """`key` extracts the ordering key from rows that are neither instances nor dicts, e.g. values_list() tuples."""
+        queryset, state = self.plan(queryset, params)
+        return self.page(list(queryset), state, key or self.get_key)
+
+    async def apaginate(self, queryset, params, key=None):
+        queryset, state = self.plan(queryset, params)
+        return self.page([row async for row in queryset], state, key or self.get_key)
+
+
+def paginated_data(request, page, data):
+    """Envelope used by the API views: absolute next/previous links plus results."""
+    params = request.query_params
+    base = request.build_absolute_uri(request.path)
+    next_query = page.next_query(params)
+    previous_query = page.previous_query(params)
+    return {
+        "next": f"{base}?{next_query}" if next_query else None,
+        "previous": f"{base}?{previous_query}" if previous_query else None,
+        "results": data,
+    }
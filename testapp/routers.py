@@ -0,0 +1,64 @@
+import random
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+
+
+PRIMARY = "default"
+
+# Per request (and per thread or task outside requests): reads go to the primary until this time
+_state = Local()
+
+
+def pinned_until():
+    return getattr(_state, "pinned_until", 0.0)
+
+
+def pin(until):
+    _state.pinned_until = max(pinned_until(), until)
+
+
+def unpin():
+    _state.pinned_until = 0.0
+    _state.wrote = False
+
+
+def wrote():
+    return getattr(_state, "wrote", False)
+
+
+def sticky_window():
+    return getattr(settings, "DATABASE_READ_YOUR_WRITES_SECONDS", 10)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the primary ("default"), reads to a random alias from
+    DATABASE_REPLICAS. A write pins the reads of the same request, thread or
+    task to the primary for DATABASE_READ_YOUR_WRITES_SECONDS; the
+    ReadYourWritesMiddleware carries that pin over to the writer's next
+    requests. select_for_update() and get_or_create() count as writes.
+    With no replicas configured everything uses the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        # DatabaseCache entries are read back by other workers right after they are written
+        if model._meta.app_label == "django_cache":
+            return PRIMARY
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        if not replicas or pinned_until() > time.time():
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin(time.time() + sticky_window())
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the primary's rows, so objects loaded from any of them can be related
+        databases = {PRIMARY, *getattr(settings, "DATABASE_REPLICAS", [])}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,249 @@
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Room
+from .routers import PRIMARY
+
+
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = {"a", "an", "and", "the", "in", "of", "on", "for", "to", "with", "at", "is", "by"}
+
+# Title words count double: a match in the title says more than one in the description
+TITLE_BOOST = 2
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+def room_tokens(title, description, location):
+    return tokenize(title) * TITLE_BOOST + tokenize(location) + tokenize(description)
+
+
+class RoomSearchIndex:
+    """
+    Inverted index over Room.title, description and location, ranked with BM25.
+    Lives in process memory and answers queries with room ids only; callers
+    hydrate the rows they need. The Room signals in signals.py apply this
+    process's writes straight away; every `sync_interval` seconds a search
+    also catches up with the DB, re-indexing rooms updated since the last
+    sync (minus `sync_lag`, for transactions that committed late) and
+    dropping deleted ones, so other processes' writes and a stale snapshot
+    are picked up too.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, snapshot_path=None, sync_interval=30.0, sync_lag=60.0):
+        self.snapshot_path = snapshot_path
+        self.sync_interval = sync_interval
+        self.sync_lag = sync_lag
+        self.lock = threading.RLock()
+        self.sync_lock = threading.Lock()
+        self.postings = {}  # term -> {room_id: term frequency}
+        self.lengths = {}  # room_id -> document length in tokens
+        self.terms = {}  # room_id -> distinct terms, so removal only touches its own postings
+        self.total_length = 0
+        self.ready = False
+        self.snapshot_mtime = None
+        self.synced_at = None  # DB time the index is current up to
+        self.checked_at = 0.0  # monotonic time of the last catch-up
+
+    # ---- building -------------------------------------------------------
+
+    def clear(self):
+        with self.lock:
+            self.postings = {}
+            self.lengths = {}
+            self.terms = {}
+            self.total_length = 0
+
+    def add(self, room_id, title, description, location):
+        tokens = room_tokens(title, description, location)
+        with self.lock:
+            self._remove(room_id)
+            counts = Counter(tokens)
+            for term, frequency in counts.items():
+                self.postings.setdefault(term, {})[room_id] = frequency
+            self.terms[room_id] = tuple(counts)
+            self.lengths[room_id] = len(tokens)
+            self.total_length += len(tokens)
+
+    def remove(self, room_id):
+        with self.lock:
+            self._remove(room_id)
+
+    def _remove(self, room_id):
+        length = self.lengths.pop(room_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.terms.pop(room_id, ()):
+            docs = self.postings[term]
+            del docs[room_id]
+            if not docs:
+                del self.postings[term]
+
+    def build(self, queryset=None):
+        # The primary, like the catch-ups: a lagging replica would leave rows out for good
+        queryset = queryset if queryset is not None else Room.objects.using(PRIMARY)
+        rows = queryset.values_list("id", "title", "description", "location")
+        started = timezone.now()
+        with self.lock:
+            self.clear()
+            for room_id, title, description, location in rows.iterator(chunk_size=2000):
+                self.add(room_id, title, description, location)
+            self.synced_at = started
+            self.checked_at = time.monotonic()
+            self.ready = True
+
+    def sync_due(self):
+        return not self.ready or time.monotonic() - self.checked_at >= self.sync_interval
+
+    def catch_up(self):
+        """Re-index rooms changed since the last sync and drop the ones deleted since."""
+        started = timezone.now()
+        since = self.synced_at - timedelta(seconds=self.sync_lag)
+        rooms = Room.objects.using(PRIMARY)
+        changed = list(rooms.filter(updated_at__gte=since).values_list("id", "title", "description", "location"))
+        for room_id, title, description, location in changed:
+            self.add(room_id, title, description, location)
+        # Every live room is indexed by now, so equal counts mean nothing was deleted
+        if rooms.count() != len(self.lengths):
+            live = set(rooms.values_list("id", flat=True).iterator(chunk_size=10000))
+            with self.lock:
+                for room_id in self.lengths.keys() - live:
+                    self._remove(room_id)
+        self.synced_at = started
+        self.checked_at = time.monotonic()
+
+    # ---- snapshots --------------------------------------------------------
+
+    def save(self, path=None):
+        path = path or self.snapshot_path
+        with self.lock:
+            data = {"postings": self.postings, "lengths": self.lengths, "terms": self.terms, "synced_at": self.synced_at}
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as handle:
+                pickle.dump(data, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        path = path or self.snapshot_path
+        with open(path, "rb") as handle:
+            data = pickle.load(handle)
+        with self.lock:
+            self.postings = data["postings"]
+            self.lengths = data["lengths"]
+            self.terms = data["terms"]
+            self.total_length = sum(self.lengths.values())
+            self.snapshot_mtime = os.stat(path).st_mtime
+            self.synced_at = data.get("synced_at") or datetime.fromtimestamp(self.snapshot_mtime, dt_timezone.utc)
+            self.checked_at = 0.0  # catch up with what changed since it was written
+            self.ready = True
+
+    def ensure_ready(self):
+        """Load the newest snapshot written by `rebuild_search_index`, else build from the DB once; then keep up with the DB."""
+        mtime = None
+        if self.snapshot_path:
+            try:
+                mtime = os.stat(self.snapshot_path).st_mtime
+            except OSError:
+                mtime = None
+        if mtime is not None and mtime != self.snapshot_mtime:
+            self.load()
+        elif not self.ready:
+            with self.lock:
+                if not self.ready:
+                    self.build()
+        # One thread catches up while the others keep searching the current index
+        if self.sync_due() and self.sync_lock.acquire(blocking=False):
+            try:
+                if self.sync_due():
+                    self.catch_up()
+            finally:
+                self.sync_lock.release()
+
+    # ---- querying -------------------------------------------------------
+
+    def search(self, query, limit=50):
+        """Return up to `limit` (room_id, score) pairs, best match first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        self.ensure_ready()
+
+        scores = {}
+        with self.lock:
+            documents = len(self.lengths)
+            if not documents:
+                return []
+            average_length = self.total_length / documents
+
+            # Rarest terms first. A term can add at most idf * (k1 + 1) to any
+            # score, so once the current k-th best beats everything the
+            # remaining terms could add, unseen rooms can't make the top k and
+            # the common terms only need to rescore the rooms we already have.
+            weighted = []
+            for term in terms:
+                docs = self.postings.get(term)
+                if docs:
+                    idf = math.log(1 + (documents - len(docs) + 0.5) / (len(docs) + 0.5))
+                    weighted.append((len(docs), idf, docs))
+            weighted.sort(key=itemgetter(0))
+            headroom = sum(idf * (self.k1 + 1) for _, idf, _ in weighted)
+
+            for _, idf, docs in weighted:
+                candidates_only = len(scores) >= limit and (
+                    heapq.nlargest(limit, scores.values())[-1] > headroom
+                )
+                headroom -= idf * (self.k1 + 1)
+                postings = ((room_id, docs.get(room_id)) for room_id in scores) if candidates_only else docs.items()
+                for room_id, frequency in postings:
+                    if not frequency:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[room_id] / average_length)
+                    scores[room_id] = scores.get(room_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+
+    def search_ids(self, query, limit=50):
+        return [room_id for room_id, _ in self.search(query, limit)]
+
+
+room_index = RoomSearchIndex(
+    getattr(settings, "ROOM_SEARCH_INDEX_PATH", None),
+    sync_interval=getattr(settings, "ROOM_SEARCH_SYNC_INTERVAL", 30.0),
+    sync_lag=getattr(settings, "ROOM_SEARCH_SYNC_LAG", 60.0),
+)
+
+
+def search_rooms(query, limit=None):
+    """Top matching rooms for `query`, hydrated with a single `in_bulk` query and kept in rank order."""
+    limit = limit or getattr(settings, "ROOM_SEARCH_LIMIT", 50)
+    ids = room_index.search_ids(query, limit)
+    rooms = Room.objects.in_bulk(ids)
+    return [rooms[room_id] for room_id in ids if room_id in rooms]
+
+
+async def asearch_rooms(query, limit=None):
+    limit = limit or getattr(settings, "ROOM_SEARCH_LIMIT", 50)
+    if not room_index.sync_due():
+        ids = room_index.search_ids(query, limit)
+    else:
+        # Building the index or catching up reads the DB, which the event loop can't do
+        ids = await sync_to_async(room_index.search_ids)(query, limit)
+    rooms = await Room.objects.ain_bulk(ids)
+    return [rooms[room_id] for room_id in ids if room_id in rooms]
@@ -0,0 +1,173 @@
+import decimal
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .room_serializers import RoomSerializer
+
+
+def decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+        return field.to_representation
+    # DecimalField.quantize, with the exponent and context worked out once
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return f'{value.quantize(quantum, rounding=rounding, context=context):f}'
+    return convert
+
+
+class CachedURLs:
+    """
+    Stands in for a storage where only url() is used. FileSystemStorage URLs
+    depend on the name alone, and rooms share a small set of images, so
+    memoizing skips the urljoin/quote work on nearly every row.
+    """
+
+    def __init__(self, storage, maxsize=10000):
+        self.url = lru_cache(maxsize=maxsize)(storage.url)
+
+
+def url_storage(storage):
+    # Other storages may sign or expire their URLs: always ask them
+    return CachedURLs(storage) if isinstance(storage, FileSystemStorage) else storage
+
+
+def datetime_converter(field):
+    """Built per serializer instance: the current time zone is looked up once, not once per row."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or hasattr(field, 'timezone'):
+        return lambda tz: field.to_representation
+
+    def bind(tz):
+        def convert(value):
+            if tz is None or isinstance(value, str) or value.tzinfo is None:
+                return field.to_representation(value)
+            text = value.astimezone(tz).isoformat()
+            return text[:-6] + 'Z' if text.endswith('+00:00') else text
+        return convert
+    return bind
+
+
+def file_converter(field, storage):
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return lambda name: name or None
+    # No request in context: FileField.to_representation returns the storage URL as-is
+    return lambda name: storage.url(name) if name else None
+
+
+def identity(value):
+    return value
+
+
+def model_field_converter(field, storage):
+    if isinstance(field, serializers.DateTimeField):
+        return datetime_converter(field)
+    if isinstance(field, serializers.DecimalField):
+        return decimal_converter(field)
+    if isinstance(field, serializers.FileField):
+        return file_converter(field, storage)
+    if isinstance(field, serializers.BooleanField):
+        return bool
+    if isinstance(field, serializers.FloatField):
+        return float
+    if isinstance(field, serializers.IntegerField):
+        return int
+    if isinstance(field, serializers.CharField):
+        return identity  # already str from the DB; CharField would only call str() again
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """
+    Read-only twin of a ModelSerializer that works on values_list() tuples.
+    The field plan (column positions and one converter per field) is built
+    once per field subset from the ModelSerializer's own fields, so output
+    is the same JSON without DRF's per-row field machinery.
+
+    Method fields need an entry in the serializer's `value_converters`,
+    called with the columns listed for them in `field_columns` and a
+    `storage` keyword argument.
+    """
+
+    serializer_class = None
+    _plans = None
+
+    def __init__(self, fields=None, storage=None):
+        self.fields = tuple(fields) if fields is not None else None
+        plans = type(self).__dict__.get('_plans')
+        if plans is None:
+            plans = type(self)._plans = {}
+        plan = plans.get(self.fields)
+        if plan is None:
+            plan = plans[self.fields] = self.build_plan(storage or default_storage)
+        self.columns, plan = plan
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        self.plan = [
+            (name, positions, convert(tz) if late else convert, method)
+            for name, positions, convert, method, late in plan
+        ]
+
+    def build_plan(self, storage):
+        serializer_class = self.serializer_class
+        prototype = serializer_class(fields=self.fields)
+        urls = url_storage(storage)
+        columns, plan = ['id'], []
+
+        def position(column):
+            if column not in columns:
+                columns.append(column)
+            return columns.index(column)
+
+        for name, field in prototype.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                sources = serializer_class.field_columns.get(name, (name,))
+                convert = partial(serializer_class.value_converters[name], storage=urls)
+                plan.append((name, tuple(position(column) for column in sources), convert, True, False))
+            else:
+                late = isinstance(field, serializers.DateTimeField)
+                plan.append((name, (position(field.source),), model_field_converter(field, urls), False, late))
+        return columns, plan
+
+    def values(self, queryset, extra=()):
+        """values_list() of exactly the columns the plan reads, plus `extra` (e.g. the sort key)."""
+        for column in extra:
+            if column not in self.columns:
+                self.columns = [*self.columns, column]
+        return queryset.values_list(*self.columns)
+
+    def key(self, fields):
+        """Pagination key getter for rows produced by values()."""
+        positions = [self.columns.index(field) for field in fields]
+        return lambda row: tuple(row[index] for index in positions)
+
+    def to_representation(self, row):
+        data = {}
+        for name, positions, convert, method in self.plan:
+            if method:
+                data[name] = convert(*(row[index] for index in positions))
+            else:
+                value = row[positions[0]]
+                data[name] = None if value is None else convert(value)
+        return data
+
+    def serialize(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
+class RoomValuesSerializer(ValuesSerializer):
+    serializer_class = RoomSerializer
@@ -1,16 +1,100 @@
 # from django.contrib.auth.models import User
 from rest_framework import serializers
-from ..models import Room, Booking
+from ..models import Room, Booking, Review
+from ..images import thumbnail_url, variant_urls
+
+class SparseFieldsMixin:
+    """
+    Pass fields=[...] to keep only those fields. `field_columns` maps fields
+    that are not plain model columns to the columns they are built from,
+    so the values() fast path can select just those (see fast_serializers.py).
+    """
+    field_columns = {}
+    _field_names = None
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def field_names(cls):
+        if cls.__dict__.get('_field_names') is None:
+            cls._field_names = list(cls().fields)
+        return cls._field_names
+
+
+class RoomSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    image_variants = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
+
+    field_columns = {
+        'image_variants': ('image_variants',),
+        'thumbnail': ('image', 'image_variants'),
+    }
+    # Same method fields for the values() fast path (fast_serializers.py)
+    value_converters = {
+        'image_variants': variant_urls,
+        'thumbnail': thumbnail_url,
+    }
 
-class RoomSerializer(serializers.ModelSerializer):
     class Meta:
         model = Room
-        fields = '__all__'
+        exclude = ['location_key']
+
+    def get_image_variants(self, obj):
+        # [{"url": ..., "width": 320, "format": "webp"}, ...] for srcset
+        return variant_urls(obj.image_variants)
+
+    def get_thumbnail(self, obj):
+        # Smallest variant, for list screens that show a single small image
+        return thumbnail_url(obj.image, obj.image_variants)
         
 
 
+class StayRangeSerializer(serializers.Serializer):
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs['check_out'] <= attrs['check_in']:
+            raise serializers.ValidationError("check_out must be after check_in.")
+        return attrs
+
+
 class BookingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
-        fields = '__all__'
+        exclude = ['request_key']
+
 
+class RoomSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Room
+        fields = ['id', 'title', 'location', 'price', 'image']
+
+
+class UserBookingSerializer(serializers.ModelSerializer):
+    # Read from the select_related room, never a query per booking
+    room = RoomSummarySerializer(read_only=True)
+
+    class Meta:
+        model = Booking
+        fields = ['id', 'room', 'booking_date', 'check_in', 'check_out']
+
+
+class ReviewAuthorSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
+
+class ReviewSerializer(serializers.ModelSerializer):
+    # Read from the select_related user, never a query per review
+    author = ReviewAuthorSerializer(source='user', read_only=True)
+    rating = serializers.IntegerField(min_value=1, max_value=5)
+
+    class Meta:
+        model = Review
+        fields = ['id', 'room', 'author', 'rating', 'comment', 'created_at']
+        read_only_fields = ['room']
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from ..models import User
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from ..tokens import RefreshToken
+from rest_framework_simplejwt.tokens import TokenError
 
 
 # Registeration Seralizers
@@ -0,0 +1,73 @@
+from django.contrib.auth import authenticate
+from rest_framework import status
+
+from ..serializers.user_serializers import UserRegisterationSerializer
+from ..tokens import RefreshToken
+
+
+# Shared by the API views and the template views, so the site never calls its own API over HTTP
+
+class AuthServiceError(Exception):
+    def __init__(self, payload, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(payload)
+        self.payload = payload
+        self.status_code = status_code
+
+    def messages(self):
+        """The error strings in the payload, in order, so the template views show what the API returns."""
+        return list(flatten_errors(self.payload))
+
+
+def flatten_errors(errors):
+    if isinstance(errors, dict):
+        for value in errors.values():
+            yield from flatten_errors(value)
+    elif isinstance(errors, (list, tuple)):
+        for value in errors:
+            yield from flatten_errors(value)
+    else:
+        yield str(errors)
+
+
+# To generate token
+def get_tokens_for_user(user):
+    refresh = RefreshToken.for_user(user)
+
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+def register_user(data):
+    """Create the user and return the registration payload, or raise AuthServiceError with the serializer errors."""
+    serializer = UserRegisterationSerializer(data=data)
+    if not serializer.is_valid():
+        raise AuthServiceError(serializer.errors)
+    user = serializer.save()
+    return {'token': get_tokens_for_user(user), 'msg': "Registration successfully"}
+
+
+def login_user(email, password):
+    user = authenticate(email=email, password=password)
+    if user is None:
+        raise AuthServiceError(
+            {"errors": {'non_field_errors': ['Email or password is not valid']}},
+            status.HTTP_401_UNAUTHORIZED,
+        )
+    return {
+        'token': get_tokens_for_user(user),
+        'msg': "Login Successfully",
+        'is_admin': user.is_superuser
+    }
+
+
+def logout_user(refresh_token):
+    if not refresh_token:
+        raise AuthServiceError({"detail": "Refresh token is required"})
+    try:
+        # Blacklist the refresh token (requires `rest_framework_simplejwt.token_blacklist`)
+        RefreshToken(refresh_token).blacklist()
+    except Exception as e:
+        raise AuthServiceError({"detail": f"Error: {str(e)}"})
+    return {"msg": "Logout Successfully"}
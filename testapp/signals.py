@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .cache import review_page_cache, room_cache
+from .images import needs_variants, schedule_variants
+from .models import Review, Room, User
+from .search import room_index
+
+
+# Keep the in-process search index current without rebuilding it
+@receiver(post_save, sender=Room)
+def index_room(sender, instance, **kwargs):
+    if room_index.ready:
+        transaction.on_commit(lambda: room_index.add(
+            instance.pk, instance.title, instance.description, instance.location
+        ))
+
+
+@receiver(post_delete, sender=Room)
+def unindex_room(sender, instance, **kwargs):
+    if room_index.ready:
+        room_id = instance.pk
+        transaction.on_commit(lambda: room_index.remove(room_id))
+
+
+# Drop cached room payloads once the write is committed
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def invalidate_room_cache(sender, instance, **kwargs):
+    room_id = instance.pk
+    transaction.on_commit(lambda: room_cache.invalidate(room_id))
+
+
+# New or replaced images get their resized variants built after commit
+@receiver(post_save, sender=Room)
+def build_image_variants(sender, instance, **kwargs):
+    if needs_variants(instance):
+        transaction.on_commit(lambda: schedule_variants(instance))
+
+
+# Review writes adjust the room's rating_avg / rating_count in place.
+# queryset.update() on reviews skips these: run `reconcile_room_ratings` after one.
+def invalidate_reviewed_room(room_id):
+    # The room payload carries the rating, the first review page the review itself
+    room_cache.invalidate(room_id)
+    review_page_cache.invalidate(room_id)
+
+
+@receiver(pre_save, sender=Review)
+def remember_stored_rating(sender, instance, **kwargs):
+    instance._stored_rating = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._stored_rating = Review.objects.filter(pk=instance.pk).values_list('room_id', 'rating').first()
+
+
+@receiver(post_save, sender=Review)
+def apply_review_rating(sender, instance, created, **kwargs):
+    stored = None if created else getattr(instance, '_stored_rating', None)
+    if stored is None:
+        Room.objects.add_rating(instance.room_id, instance.rating)
+        touched = {instance.room_id}
+    else:
+        room_id, rating = stored
+        if room_id == instance.room_id:
+            if rating != instance.rating:
+                Room.objects.change_rating(room_id, rating, instance.rating)
+        else:
+            Room.objects.remove_rating(room_id, rating)
+            Room.objects.add_rating(instance.room_id, instance.rating)
+        touched = {room_id, instance.room_id}
+    for room_id in touched:
+        transaction.on_commit(lambda room_id=room_id: invalidate_reviewed_room(room_id))
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    room_id = instance.room_id
+    Room.objects.remove_rating(room_id, instance.rating)
+    transaction.on_commit(lambda: invalidate_reviewed_room(room_id))
+
+
+# Authentication serves users from an in-process cache: bump the user's version
+# on any write, so deactivations and password changes apply from the next request.
+# queryset.update() on users skips this; entries then expire after JWT_USER_CACHE_TTL.
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_id = str(instance.pk)
+    invalidate_user(user_id)
+    # A request that read the old row before the commit could have cached it again
+    transaction.on_commit(lambda: invalidate_user(user_id))
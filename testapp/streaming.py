@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def chunk_query(queryset, serializer, chunk_size, after):
+    # values() rows always start with the primary key (see fast_serializers.py)
+    return serializer.values(queryset).filter(pk__gt=after).order_by("pk")[:chunk_size]
+
+
+def iter_json_array(queryset, serializer_class, chunk_size=None, **serializer_kwargs):
+    """
+    Yield `queryset` as a JSON array piece by piece, using the values()
+    serializer `serializer_class`. Rows are read in primary-key chunks
+    (pk > last LIMIT n), not through iterator(), which MySQL's driver
+    buffers in full; memory stays at one chunk however many rows there are.
+    """
+    chunk_size = chunk_size or getattr(settings, "ROOM_EXPORT_CHUNK_SIZE", 2000)
+    serializer = serializer_class(**serializer_kwargs)
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    yield "["
+    separator, after = "", 0
+    while True:
+        rows = list(chunk_query(queryset, serializer, chunk_size, after))
+        if not rows:
+            break
+        for row in rows:
+            yield separator + encoder.encode(serializer.to_representation(row))
+            separator = ","
+        after = rows[-1][0]
+    yield "]"
+
+
+async def aiter_json_array(queryset, serializer_class, chunk_size=None, **serializer_kwargs):
+    """iter_json_array for async views: an ASGI server would otherwise read a sync iterator into memory first."""
+    chunk_size = chunk_size or getattr(settings, "ROOM_EXPORT_CHUNK_SIZE", 2000)
+    serializer = serializer_class(**serializer_kwargs)
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    yield "["
+    separator, after = "", 0
+    while True:
+        rows = [row async for row in chunk_query(queryset, serializer, chunk_size, after)]
+        if not rows:
+            break
+        for row in rows:
+            yield separator + encoder.encode(serializer.to_representation(row))
+            separator = ","
+        after = rows[-1][0]
+    yield "]"
+
+
+def streaming_json_response(queryset, serializer_class, chunk_size=None, asynchronous=False, **serializer_kwargs):
+    iterate = aiter_json_array if asynchronous else iter_json_array
+    return StreamingHttpResponse(
+        iterate(queryset, serializer_class, chunk_size, **serializer_kwargs),
+        content_type="application/json",
+    )
+
+
+def wants_stream(request):
+    return request.query_params.get("stream", "").lower() in ("1", "true", "yes")
@@ -0,0 +1,16 @@
+from django import template
+
+from ..images import srcset as build_srcset, variant_urls
+
+
+register = template.Library()
+
+
+@register.filter
+def srcset(room, fmt):
+    """`{{ room|srcset:"webp" }}` for a Room instance or a serialized room payload."""
+    if isinstance(room, dict):
+        variants = room.get("image_variants") or []
+    else:
+        variants = variant_urls(getattr(room, "image_variants", None))
+    return build_srcset(variants, fmt)
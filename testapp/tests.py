@@ -1,3 +1,1229 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+import warnings
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import user_cache, user_version_key, user_versions
+from .cache import ObjectCache, review_page_cache, room_cache
+from .hashing import HashingBusy, admission_limit, password_hashing
+from .images import apply_variants
+from .middleware import JWTSessionMiddleware, ReadYourWritesMiddleware, RepeatedQueryError, RepeatedQueryWarning
+from .models import Booking, Review, Room, User
+from .pagination import encode_cursor
+from .search import RoomSearchIndex
+from .serializers.fast_serializers import RoomValuesSerializer
+from .serializers.room_serializers import RoomSerializer
+from .services.auth_services import get_tokens_for_user
+from .tokens import BlacklistFilter, BloomFilter, RefreshToken, TokenRefreshSerializer, blacklist_filter
+from . import routers, views
+
+
+class MyBookingsQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("guest@example.com", "Guest", True, "pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def book_rooms(self, count):
+        start = date(2030, 1, 1)
+        for i in range(count):
+            room = Room.objects.create(
+                image="room_images/home1.jpg", title=f"Room {i}", price=1000 + i,
+                location="Pune", description="nice flat",
+            )
+            Booking.objects.create(
+                user=self.user, room=room,
+                check_in=start + timedelta(days=i), check_out=start + timedelta(days=i + 1),
+            )
+
+    def queries_for_page(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("my_bookings"))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_bookings(self):
+        self.book_rooms(1)
+        _, few = self.queries_for_page()
+        self.book_rooms(15)
+        response, many = self.queries_for_page()
+        self.assertEqual(few, many)
+        self.assertEqual(len(response.data["results"]), 16)
+
+    def test_page_embeds_rooms_in_one_query(self):
+        self.book_rooms(5)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("my_bookings"))
+        first = response.data["results"][0]
+        self.assertEqual(first["room"]["title"], "Room 4")  # latest stay first
+        self.assertEqual(set(first["room"]), {"id", "title", "location", "price", "image"})
+
+    def test_only_own_bookings_and_cursor_paging(self):
+        self.book_rooms(3)
+        other = User.objects.create_user("other@example.com", "Other", True, "pass1234")
+        room = Room.objects.first()
+        Booking.objects.create(user=other, room=room, check_in=date(2031, 1, 1), check_out=date(2031, 1, 2))
+
+        response = self.client.get(reverse("my_bookings"), {"page_size": 2})
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([b["room"]["title"] for b in response.data["results"]], ["Room 0"])
+
+
+class BookingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("booker@example.com", "Booker", True, "pass1234")
+        self.room = Room.objects.create(image="room_images/home1.jpg", title="Loft", price=900, location="Pune", description="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def book(self, room_id, check_in, check_out):
+        return self.client.post(reverse("booking_room", args=[room_id]), {"check_in": check_in, "check_out": check_out}, format="json")
+
+    def test_overlapping_stays_and_missing_rooms_are_refused(self):
+        self.assertEqual(self.book(self.room.pk, "2030-01-01", "2030-01-04").status_code, 201)
+        self.assertEqual(self.book(self.room.pk, "2030-01-03", "2030-01-05").status_code, 400)
+        self.assertEqual(self.book(self.room.pk, "2030-01-04", "2030-01-05").status_code, 201)
+        self.assertEqual(self.book(0, "2030-01-01", "2030-01-02").status_code, 404)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_retry_with_the_same_key_replays_the_response(self):
+        stay = {"check_in": "2030-01-01", "check_out": "2030-01-04"}
+        url = reverse("booking_room", args=[self.room.pk])
+        first = self.client.post(url, stay, format="json", HTTP_IDEMPOTENCY_KEY="retry-1")
+        retry = self.client.post(url, stay, format="json", HTTP_IDEMPOTENCY_KEY="retry-1")
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_same_key_with_a_different_body_is_refused(self):
+        url = reverse("booking_room", args=[self.room.pk])
+        self.client.post(url, {"check_in": "2030-01-01", "check_out": "2030-01-04"}, format="json", HTTP_IDEMPOTENCY_KEY="retry-2")
+        response = self.client.post(url, {"check_in": "2030-02-01", "check_out": "2030-02-04"}, format="json", HTTP_IDEMPOTENCY_KEY="retry-2")
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_double_submitted_booking_form_books_once(self):
+        site = Client()
+        site.force_login(self.user)
+        form = {"check_in": "2030-01-01", "check_out": "2030-01-04", "booking_key": "form-1"}
+        for _ in range(2):
+            response = site.post(reverse("room_booking", args=[self.room.pk]), form)
+        self.assertRedirects(response, reverse("room_details", args=[self.room.pk]), fetch_redirect_response=False)
+        self.assertEqual(Booking.objects.get().request_key, "form-1")
+        self.assertEqual([str(message) for message in get_messages(response.wsgi_request)][-1], "You have already booked this room.")
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("finder@example.com", "Finder", True, "pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.rooms = [
+            Room.objects.create(image="room_images/home1.jpg", title=f"Room {i}", price=900, location="Pune", description="x")
+            for i in range(4)
+        ]
+        Room.objects.create(image="room_images/home1.jpg", title="Unlisted", price=900, location="Pune", description="x", availability=False)
+        # Every room but the last is booked for 10-13 January
+        for room in self.rooms[:3]:
+            Booking.objects.create(user=self.user, room=room, check_in=date(2030, 1, 10), check_out=date(2030, 1, 13))
+
+    def available(self, check_in, check_out):
+        return self.client.get(reverse("available_rooms"), {"check_in": check_in, "check_out": check_out})
+
+    def titles(self, response):
+        return [room["title"] for room in response.data["results"]]
+
+    def test_only_overlapping_stays_take_a_room(self):
+        cases = {
+            ("2030-01-11", "2030-01-12"): ["Room 3"],  # inside the booking
+            ("2030-01-08", "2030-01-11"): ["Room 3"],  # overlaps the first night
+            ("2030-01-12", "2030-01-15"): ["Room 3"],  # overlaps the last night
+            ("2030-01-07", "2030-01-10"): ["Room 0", "Room 1", "Room 2", "Room 3"],  # leaves as the booking arrives
+            ("2030-01-13", "2030-01-14"): ["Room 0", "Room 1", "Room 2", "Room 3"],  # arrives as the booking leaves
+            ("2030-02-01", "2030-02-03"): ["Room 0", "Room 1", "Room 2", "Room 3"],  # disjoint
+        }
+        for (check_in, check_out), expected in cases.items():
+            with self.subTest(check_in=check_in, check_out=check_out):
+                self.assertEqual(self.titles(self.available(check_in, check_out)), expected)
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.available("2030-01-11", "2030-01-12").data["results"]), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.available("2030-02-01", "2030-02-03").data["results"]), 4)
+
+    def test_invalid_ranges_are_rejected(self):
+        self.assertEqual(self.available("2030-01-12", "2030-01-12").status_code, 400)
+        self.assertEqual(self.available("2030-01-12", "").status_code, 400)
+
+
+class RoomRatingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("reviewer@example.com", "Reviewer", True, "pass1234")
+        self.rooms = [
+            Room.objects.create(image="room_images/home1.jpg", title=f"Room {i}", price=900, location="Pune", description="x")
+            for i in range(2)
+        ]
+
+    def review(self, room, rating):
+        return Review.objects.create(user=self.user, room=room, rating=rating)
+
+    def assertRating(self, room, avg, count):
+        room.refresh_from_db()
+        self.assertAlmostEqual(room.rating_avg, avg)
+        self.assertEqual(room.rating_count, count)
+
+    def test_reviews_keep_the_room_aggregates(self):
+        room, other = self.rooms
+        first = self.review(room, 4)
+        self.assertRating(room, 4, 1)
+        second = self.review(room, 2)
+        self.assertRating(room, 3, 2)
+
+        second.rating = 5
+        second.save()
+        self.assertRating(room, 4.5, 2)
+
+        # Moved to another room: counted there, no longer here
+        second.room = other
+        second.save()
+        self.assertRating(room, 4, 1)
+        self.assertRating(other, 5, 1)
+
+        second.delete()
+        self.assertRating(other, 0, 0)
+        first.delete()
+        self.assertRating(room, 0, 0)
+
+    def test_reconcile_repairs_drifted_rooms(self):
+        room, other = self.rooms
+        self.review(room, 4)
+        self.review(room, 5)
+        # queryset.update() skips the signals, so the aggregates drift
+        Review.objects.filter(room=room).update(rating=1)
+        Room.objects.filter(pk=other.pk).update(rating_avg=3, rating_count=7)
+
+        out = StringIO()
+        call_command("reconcile_room_ratings", dry_run=True, stdout=out)
+        self.assertIn("would fix 2", out.getvalue())
+        self.assertRating(room, 4.5, 2)
+
+        call_command("reconcile_room_ratings", batch_size=1, stdout=StringIO())
+        self.assertRating(room, 1, 2)
+        self.assertRating(other, 0, 0)
+
+
+class RoomReviewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = Room.objects.create(image="", title="Loft", price=900, location="Pune", description="x")
+        cls.users = [User.objects.create_user(f"guest{i}@example.com", f"Guest {i}", True, "pass1234") for i in range(6)]
+        now = timezone.now()
+        for i, user in enumerate(cls.users[:5]):
+            review = Review.objects.create(user=user, room=cls.room, rating=i + 1, comment=f"Stay {i}")
+            Review.objects.filter(pk=review.pk).update(created_at=now - timedelta(days=5 - i))
+
+    def setUp(self):
+        review_page_cache.cache.clear()
+        self.url = reverse("room_reviews", args=[self.room.pk])
+        self.client = APIClient()
+
+    def comments(self, response):
+        return [review["comment"] for review in response.data["results"]]
+
+    def test_pages_newest_first_by_cursor(self):
+        first = self.client.get(self.url, {"page_size": 2})
+        self.assertEqual(self.comments(first), ["Stay 4", "Stay 3"])
+        second = self.client.get(first.data["next"])
+        self.assertEqual(self.comments(second), ["Stay 2", "Stay 1"])
+        last = self.client.get(second.data["next"])
+        self.assertEqual(self.comments(last), ["Stay 0"])
+        self.assertIsNone(last.data["next"])
+        self.assertEqual(self.comments(self.client.get(last.data["previous"])), ["Stay 2", "Stay 1"])
+
+    def test_page_queries_do_not_grow_with_its_size(self):
+        with CaptureQueriesContext(connection) as short:
+            self.assertEqual(len(self.client.get(self.url, {"page_size": 1}).data["results"]), 1)
+        with self.assertNumQueries(len(short)):
+            response = self.client.get(self.url, {"page_size": 5})
+        self.assertEqual(response.data["results"][0]["author"]["name"], "Guest 4")
+
+    def test_first_page_is_cached_until_a_review_commits(self):
+        self.assertEqual(self.comments(self.client.get(self.url))[0], "Stay 4")
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.client.get(self.url).data["results"]), 5)
+
+        self.client.force_authenticate(self.users[5])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {"rating": 5, "comment": "Fresh"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.comments(self.client.get(self.url))[0], "Fresh")
+
+    def test_anonymous_post_is_refused(self):
+        response = self.client.post(self.url, {"rating": 5, "comment": "Anonymous"}, format="json")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(Review.objects.count(), 5)
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.rooms = [
+            Room.objects.create(image="room_images/home1.jpg", title=f"Room {i}", price=900 + i, location="Pune", description="x")
+            for i in range(5)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("pager@example.com", "Pager", True, "pass1234"))
+
+    def titles(self, response):
+        return [room["title"] for room in response.data["results"]]
+
+    def test_room_list_pages_forward_and_back(self):
+        first = self.client.get(reverse("list_rooms"), {"page_size": 2})
+        self.assertEqual(self.titles(first), ["Room 0", "Room 1"])
+        self.assertIsNone(first.data["previous"])
+        second = self.client.get(first.data["next"])
+        self.assertEqual(self.titles(second), ["Room 2", "Room 3"])
+        last = self.client.get(second.data["next"])
+        self.assertEqual(self.titles(last), ["Room 4"])
+        self.assertIsNone(last.data["next"])
+
+        back = self.client.get(last.data["previous"])
+        self.assertEqual(self.titles(back), ["Room 2", "Room 3"])
+        self.assertEqual(self.titles(self.client.get(back.data["previous"])), ["Room 0", "Room 1"])
+
+    def test_room_listing_page_pages_forward_and_back(self):
+        client = Client()
+        first = client.get(reverse("room_listing"), {"page_size": 2})
+        self.assertEqual([room.title for room in first.context["rooms"]], ["Room 0", "Room 1"])
+        self.assertIsNone(first.context["previous_query"])
+        second = client.get(f"{reverse('room_listing')}?{first.context['next_query']}")
+        self.assertEqual([room.title for room in second.context["rooms"]], ["Room 2", "Room 3"])
+        back = client.get(f"{reverse('room_listing')}?{second.context['previous_query']}")
+        self.assertEqual([room.title for room in back.context["rooms"]], ["Room 0", "Room 1"])
+        self.assertIsNone(back.context["previous_query"])
+
+    def test_tampered_cursor_is_rejected(self):
+        cursors = {
+            reverse("list_rooms"): [["abc"], [{"a": 1}], [None]],
+            reverse("Search_filter"): [["abc", 1], [900, [1]]],
+            reverse("my_bookings"): [["2030-13-01", 1], [{"a": 1}, 1]],
+        }
+        for url, keys in cursors.items():
+            for key in keys:
+                with self.subTest(url=url, key=key):
+                    response = self.client.get(url, {"cursor": encode_cursor(key)})
+                    self.assertEqual(response.status_code, 400)
+
+
+@override_settings(ROOM_EXPORT_CHUNK_SIZE=2)
+class StreamedExportTests(TestCase):
+    def setUp(self):
+        for i in range(5):
+            Room.objects.create(image="room_images/home1.jpg", title=f"Room {i}", price=900 + i, location="Pune", description="x")
+        Room.objects.filter(title="Room 2").delete()  # a gap in the ids
+        self.user = User.objects.create_user("export@example.com", "Export", True, "pass1234")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def listed(self, **params):
+        return self.client.get(reverse("list_rooms"), {"page_size": 100, **params}).data["results"]
+
+    def test_stream_matches_the_paged_list(self):
+        for params in ({}, {"fields": "id,title,thumbnail"}, {"omit": "id"}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse("list_rooms"), {"stream": 1, **params})
+                self.assertTrue(response.streaming)
+                self.assertEqual(json.loads(b"".join(response.streaming_content)), json.loads(json.dumps(self.listed(**params))))
+
+    def test_async_stream_matches_the_paged_list(self):
+        request = APIRequestFactory().get("/rooms/api/", {"stream": 1})
+        force_authenticate(request, self.user)
+        response = async_to_sync(views.AsyncListAPIView.as_view())(request)
+
+        async def read():
+            return b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(json.loads(async_to_sync(read)()), json.loads(json.dumps(self.listed())))
+
+
+class ImportRoomsTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.media = os.path.join(self.dir.name, "media")
+        media = override_settings(MEDIA_ROOT=self.media)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.path = os.path.join(self.dir.name, "rooms.csv")
+
+    def write_rows(self, rows):
+        with open(self.path, "w", newline="") as handle:
+            handle.write("image,title,price,location,description\n")
+            for i, (title, price) in enumerate(rows, start=1):
+                with open(os.path.join(self.dir.name, f"room{i}.jpg"), "wb") as image:
+                    image.write(b"jpeg")
+                handle.write(f"room{i}.jpg,{title},{price},New Delhi,flat\n")
+
+    def run_import(self, **options):
+        call_command("import_rooms", self.path, batch_size=2, stdout=StringIO(), **options)
+
+    def errors(self):
+        with open(f"{self.path}.errors.jsonl") as handle:
+            return [json.loads(line)["row"] for line in handle]
+
+    def stored_images(self):
+        return sorted(os.listdir(os.path.join(self.media, "room_images")))
+
+    def test_batches_import_and_bad_rows_are_reported(self):
+        self.write_rows([("Loft", 900), ("", 900), ("Flat", "abc"), ("Villa", 1500), ("Studio", 700)])
+        os.remove(os.path.join(self.dir.name, "room5.jpg"))
+        self.run_import()
+        self.assertEqual(list(Room.objects.order_by("id").values_list("title", flat=True)), ["Loft", "Villa"])
+        self.assertEqual(set(Room.objects.values_list("location_key", flat=True)), {"new delhi"})
+        self.assertEqual(self.errors(), [2, 3, 5])
+        self.assertEqual(self.stored_images(), ["room1.jpg", "room4.jpg"])
+
+    def test_resume_after_a_failed_batch(self):
+        self.write_rows([("", 900), ("Loft", 900), ("Flat", 900), ("", 900), ("Villa", 900), ("Studio", 900)])
+        bulk_create = Room.objects.bulk_create
+        calls = []
+
+        def fail_second_batch(rooms):
+            calls.append(rooms)
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            return bulk_create(rooms)
+
+        with mock.patch.object(Room.objects, "bulk_create", fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        # The failed batch's rooms and copied images are gone; its rejected row was logged
+        self.assertEqual(Room.objects.count(), 2)
+        self.assertEqual(self.stored_images(), ["room2.jpg", "room3.jpg"])
+        self.assertEqual(self.errors(), [1, 4])
+
+        self.run_import(resume=True)
+        self.assertEqual(Room.objects.count(), 4)
+        self.assertEqual(self.errors(), [1, 4])
+        self.assertEqual(self.stored_images(), ["room2.jpg", "room3.jpg", "room5.jpg", "room6.jpg"])
+        self.assertEqual(sorted(Room.objects.values_list("image", flat=True)), [f"room_images/{name}" for name in self.stored_images()])
+
+
+class RoomValuesSerializerParityTests(TestCase):
+    def setUp(self):
+        variants = {
+            "source": "room_images/loft.jpg",
+            "variants": [
+                {"name": "room_images/loft.w640.webp", "width": 640, "format": "webp"},
+                {"name": "room_images/loft.w320.webp", "width": 320, "format": "webp"},
+                {"name": "room_images/loft.w320.jpg", "width": 320, "format": "jpeg"},
+            ],
+        }
+        Room.objects.create(
+            image="room_images/loft.jpg", title="Loft über dem Café", price=Decimal("0.5"),
+            location="  New  Delhi ", description="quiet \"top\" floor\n", availability=False,
+        )
+        Room.objects.create(
+            image="room_images/plain room.jpg", title="Plain", price=Decimal("99999999.99"),
+            location="Pune", description="",
+        )
+        Room.objects.create(image="", title="No image", price=Decimal("1200"), location="Goa", description="x")
+        Room.objects.filter(title__startswith="Loft").update(
+            image_variants=variants, rating_avg=10 / 3, rating_count=3,
+        )
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def assertSameBytes(self, fields=None):
+        rooms = Room.objects.order_by("id")
+        expected = self.render(RoomSerializer(rooms, many=True, fields=fields).data)
+        serializer = RoomValuesSerializer(fields=fields)
+        actual = self.render(serializer.serialize(serializer.values(rooms)))
+        self.assertEqual(actual, expected)
+
+    def test_full_representation_matches(self):
+        self.assertSameBytes()
+
+    def test_field_subsets_match(self):
+        for fields in (["id", "title", "price", "location", "thumbnail"], ["availability", "updated_at"], ["rating_avg"]):
+            with self.subTest(fields=fields):
+                self.assertSameBytes(fields)
+
+    def test_list_endpoint_matches_room_serializer(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("list@example.com", "List", True, "pass1234"))
+        response = client.get(reverse("list_rooms"))
+        expected = self.render(RoomSerializer(Room.objects.order_by("id"), many=True).data)
+        self.assertEqual(self.render(response.data["results"]), expected)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        room_cache.cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("sparse@example.com", "Sparse", True, "pass1234"))
+        self.room = Room.objects.create(image="room_images/home1.jpg", title="Loft", price=900, location="Pune", description="x")
+
+    def test_list_and_search_load_only_the_requested_columns(self):
+        cases = [
+            (reverse("list_rooms"), {"fields": "id,title,thumbnail"}, {"id", "title", "thumbnail"}),
+            (reverse("Search_filter"), {"location": "pune", "fields": "title,price"}, {"title", "price"}),
+            (reverse("Search_filter"), {"location": "pune", "omit": "description,image_variants"},
+             set(RoomSerializer.field_names()) - {"description", "image_variants"}),
+        ]
+        for url, params, expected in cases:
+            with self.subTest(url=url, params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, params)
+                self.assertEqual(set(response.data["results"][0]), expected)
+                self.assertFalse([query["sql"] for query in queries if "description" in query["sql"]])
+        self.assertEqual(response.data["results"][0]["title"], "Loft")
+
+    def test_retrieve_trims_the_payload(self):
+        url = reverse("retrieve_room", args=[self.room.pk])
+        self.assertEqual(self.client.get(url, {"fields": "title,price"}).data, {"title": "Loft", "price": "900.00"})
+        self.assertNotIn("description", self.client.get(url, {"omit": "description"}).data)
+
+    def test_unknown_fields_are_rejected(self):
+        for url in (reverse("list_rooms"), reverse("Search_filter"), reverse("retrieve_room", args=[self.room.pk])):
+            for params in ({"fields": "title,bogus"}, {"omit": "bogus"}):
+                with self.subTest(url=url, params=params):
+                    response = self.client.get(url, params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn("bogus", str(response.data))
+
+
+class ObjectCacheTests(TestCase):
+    def setUp(self):
+        self.loads = []
+        self.cache = ObjectCache(prefix=f"test-{self.id()}", loader=self.load, timeout=60, grace=30)
+        room_cache.cache.clear()  # room ids are reused between tests
+
+    def load(self, pk):
+        self.loads.append(pk)
+        return {"pk": pk, "load": len(self.loads)}
+
+    def expire(self, pk):
+        # Past the soft expiry but inside the grace window
+        key = self.cache.payload_key(pk, self.cache.get_version(pk))
+        entry = self.cache.cache.get(key)
+        self.cache.cache.set(key, {**entry, "fresh_until": time.time() - 1}, 30)
+
+    def test_hits_and_misses_are_counted(self):
+        self.assertEqual(self.cache.get(1)["load"], 1)
+        self.assertEqual(self.cache.get(1)["load"], 1)
+        self.assertEqual(self.cache.get(2)["load"], 2)
+        self.assertEqual(self.cache.stats.snapshot(), {"hits": 1, "misses": 2, "stale_hits": 0, "coalesced": 0, "invalidations": 0})
+
+    def test_invalidate_swaps_the_version(self):
+        self.cache.get(1)
+        version = self.cache.get_version(1)
+        self.cache.invalidate(1)
+        self.assertNotEqual(self.cache.get_version(1), version)
+        self.assertEqual(self.cache.get(1)["load"], 2)
+
+    def test_stale_payload_is_served_while_one_caller_reloads(self):
+        self.cache.get(1)
+        self.expire(1)
+        # Another caller holds the reload lock: everyone else gets the stale copy
+        self.cache.cache.add(self.cache.lock_key(1), 1, 5)
+        self.assertEqual([self.cache.get(1)["load"] for _ in range(3)], [1, 1, 1])
+        self.assertEqual(self.cache.stats.snapshot()["stale_hits"], 3)
+        self.assertEqual(self.loads, [1])
+
+        self.cache.cache.delete(self.cache.lock_key(1))
+        self.assertEqual(self.cache.get(1)["load"], 2)
+        self.assertEqual(self.cache.get(1)["load"], 2)
+
+    def test_saving_or_deleting_a_room_bumps_its_version(self):
+        # No image, so the commit callbacks don't start building variants
+        room = Room.objects.create(image="", title="Loft", price=900, location="Pune", description="x")
+        self.assertEqual(room_cache.get(room.pk)["title"], "Loft")
+
+        version = room_cache.get_version(room.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            room.title = "Attic"
+            room.save()
+        self.assertNotEqual(room_cache.get_version(room.pk), version)
+        self.assertEqual(room_cache.get(room.pk)["title"], "Attic")
+
+        version = room_cache.get_version(room.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            room_id = room.pk
+            room.delete()
+        self.assertNotEqual(room_cache.get_version(room_id), version)
+        self.assertIsNone(room_cache.get(room_id))
+
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("etag@example.com", "Etag", True, "pass1234"))
+        self.rooms = [
+            Room.objects.create(image="room_images/home1.jpg", title=f"Room {i}", price=900 + i, location="Pune", description="x")
+            for i in range(2)
+        ]
+
+    def test_not_modified_carries_the_validators(self):
+        for url in (reverse("list_rooms"), reverse("retrieve_room", args=[self.rooms[0].pk])):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], first["ETag"])
+                self.assertEqual(response.get("Last-Modified"), first.get("Last-Modified"))
+
+    def test_deleting_a_room_changes_the_collection(self):
+        first = self.client.get(reverse("list_rooms"))
+        self.assertNotIn("Last-Modified", first)
+        self.rooms[0].delete()
+        response = self.client.get(
+            reverse("list_rooms"), HTTP_IF_NONE_MATCH=first["ETag"], HTTP_IF_MODIFIED_SINCE=http_date(time.time()),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_pages_are_validated_without_a_table_aggregate(self):
+        for url in (reverse("list_rooms"), reverse("Search_filter") + "?location=Pune"):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertFalse([query["sql"] for query in queries if "COUNT(" in query["sql"] or "MAX(" in query["sql"]])
+
+                Room.objects.filter(pk=self.rooms[0].pk).update(title="Renamed", updated_at=timezone.now())
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], first["ETag"])
+
+
+class ImageVariantTests(TestCase):
+    def test_applying_variants_refreshes_every_room_sharing_the_image(self):
+        rooms = [
+            Room.objects.create(image="room_images/shared.jpg", title=f"Room {i}", price=900, location="Pune", description="x")
+            for i in range(2)
+        ]
+        self.assertEqual([room_cache.get(room.pk)["image_variants"] for room in rooms], [[], []])
+
+        result = {"source": "room_images/shared.jpg", "variants": [{"name": "room_images/shared.w320.webp", "width": 320, "format": "webp"}]}
+        self.assertEqual(apply_variants(result), 2)
+        for room in rooms:
+            self.assertEqual(len(room_cache.get(room.pk)["image_variants"]), 1)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user("guest@example.com", "Guest", True, "pass1234")
+        self.client = APIClient()
+        token = get_tokens_for_user(self.user)["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_known_user_costs_no_queries(self):
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("profile"))
+        self.assertEqual(response.data["email"], "guest@example.com")
+
+    def test_saving_the_user_drops_the_cached_row(self):
+        self.client.get(reverse("profile"))
+        self.user.name = "Renamed"
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("profile")).data["name"], "Renamed")
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 401)
+
+    def test_a_deactivation_in_another_process_is_seen_through_the_version(self):
+        self.client.get(reverse("profile"))
+        # Another worker saves the user: the row changes and the shared version is bumped,
+        # but this process's user_cache entry is left alone
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        user_versions().set(user_version_key(self.user.pk), time.time_ns(), None)
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 401)
+
+
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        blacklist_filter.reset()
+        self.user = User.objects.create_user("guest@example.com", "Guest", True, "pass1234")
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post(reverse("token_refresh"), {"refresh": token}, format="json")
+
+    def test_rotated_and_logged_out_tokens_are_rejected(self):
+        first = get_tokens_for_user(self.user)["refresh"]
+        response = self.refresh(first)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(first).status_code, 401)
+
+        second = response.data["refresh"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.client.post(reverse("logout"), {"refresh": second}, format="json")
+        self.assertEqual(self.refresh(second).status_code, 401)
+
+    def test_tokens_blacklisted_elsewhere_are_picked_up(self):
+        token = get_tokens_for_user(self.user)["refresh"]
+        self.assertEqual(self.refresh(get_tokens_for_user(self.user)["refresh"]).status_code, 200)
+        # Blacklisted by another process: only the table knows about it
+        outstanding = OutstandingToken.objects.get(token=token)
+        BlacklistedToken.objects.create(token=outstanding)
+        blacklist_filter.synced_at = 0
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_rows_committed_out_of_id_order_are_picked_up(self):
+        tokens = [get_tokens_for_user(self.user)["refresh"] for _ in range(2)]
+        late, early = [OutstandingToken.objects.get(token=token) for token in tokens]
+        BlacklistedToken.objects.create(id=10, token=early)
+        self.assertFalse(blacklist_filter.might_contain(late.jti))
+        # Another process's transaction took id 5 before ours but committed after the sync
+        BlacklistedToken.objects.create(id=5, token=late)
+        blacklist_filter.synced_at = 0
+        self.assertTrue(blacklist_filter.might_contain(late.jti))
+        self.assertEqual(self.refresh(tokens[0]).status_code, 401)
+
+    def test_sync_asks_only_for_new_ids_and_gaps(self):
+        outstanding = [OutstandingToken.objects.get(token=get_tokens_for_user(self.user)["refresh"]) for _ in range(4)]
+        for blacklisted_id, token in zip((1, 2, 5), outstanding):
+            BlacklistedToken.objects.create(id=blacklisted_id, token=token)
+        blacklist_filter.might_contain("warm-up")
+        self.assertEqual((blacklist_filter.last_id, blacklist_filter.gaps), (5, {3, 4}))
+
+        BlacklistedToken.objects.create(id=4, token=outstanding[3])
+        blacklist_filter.synced_at = 0
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(blacklist_filter.might_contain(outstanding[3].jti))
+        self.assertEqual((blacklist_filter.last_id, blacklist_filter.gaps), (5, {3}))
+        self.assertEqual(len(queries), 1)
+
+    def test_background_rebuild_serves_the_old_filter_until_the_swap(self):
+        released = threading.Event()
+        builds = []
+
+        def build():
+            builds.append(1)
+            released.wait(5)
+            bloom = BloomFilter(100, 0.01)
+            bloom.add("new")
+            return bloom, 0, set()
+
+        token_filter = BlacklistFilter(capacity=100, sync_interval=3600, asynchronous=True)
+        token_filter.build = build
+        # Cold: nothing to serve yet, so every token is a maybe and goes to the table
+        self.assertTrue(token_filter.might_contain("new"))
+        released.set()
+        self.wait_for_rebuild(token_filter)
+
+        # Due again: the running rebuild doesn't block, and no second one starts
+        released.clear()
+        token_filter.built_at -= 2 * token_filter.rebuild_interval
+        self.assertTrue(token_filter.might_contain("new"))
+        self.assertFalse(token_filter.might_contain("late"))
+        token_filter.add("late")
+        self.assertTrue(token_filter.might_contain("late"))
+        self.assertEqual(len(builds), 2)
+        released.set()
+        self.wait_for_rebuild(token_filter)
+        self.assertTrue(token_filter.might_contain("late"))  # replayed into the new filter
+        self.assertEqual(len(builds), 2)
+
+    def wait_for_rebuild(self, token_filter):
+        deadline = time.monotonic() + 5
+        while token_filter.rebuilding and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(token_filter.rebuilding)
+
+    def test_prune_deletes_only_expired_tokens(self):
+        get_tokens_for_user(self.user)
+        expired = OutstandingToken.objects.create(
+            user=self.user, jti="old", token="old", expires_at=timezone.now() - timedelta(days=1),
+        )
+        BlacklistedToken.objects.create(token=expired)
+        call_command("prune_tokens", batch_size=1, stdout=StringIO())
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        User.objects.create_user("guest@example.com", "Guest", True, "pass1234")
+        self.client = APIClient()
+
+    def login(self):
+        return self.client.post(
+            reverse("login"), {"email": "guest@example.com", "password": "pass1234"}, format="json",
+        )
+
+    def test_login_hashes_on_the_pool(self):
+        completed = password_hashing.stats.snapshot()["completed"]
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(password_hashing.stats.snapshot()["completed"], completed + 1)
+
+    def saturated(self, send):
+        taken = 0
+        while password_hashing.slots.acquire(blocking=False):
+            taken += 1
+        try:
+            return send()
+        finally:
+            for _ in range(taken):
+                password_hashing.slots.release()
+
+    def test_saturated_pool_rejects_with_retry_after(self):
+        response = self.saturated(self.login)
+        self.assertEqual(response.status_code, 503)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        self.assertEqual(response.data["detail"], HashingBusy.message)
+
+    def test_saturated_pool_on_the_site_and_admin_logins(self):
+        site = Client()
+        credentials = {"email": "guest@example.com", "password": "pass1234"}
+        for url, data in (
+            (reverse("login user"), credentials),
+            (reverse("admin:login"), {"username": "guest@example.com", "password": "pass1234"}),
+        ):
+            with self.subTest(url=url):
+                response = self.saturated(lambda: site.post(url, data))
+                self.assertEqual(response.status_code, 503)
+                self.assertGreaterEqual(int(response["Retry-After"]), 1)
+                self.assertIn(HashingBusy.message, response.content.decode())
+
+    def test_admission_leaves_the_reserved_threads_free(self):
+        with override_settings(SERVER_THREADS=8, PASSWORD_HASH_RESERVED_THREADS=6):
+            self.assertEqual(admission_limit(), 2)
+        with override_settings(SERVER_THREADS=2, PASSWORD_HASH_RESERVED_THREADS=4):
+            self.assertEqual(admission_limit(), 1)
+        self.assertLess(password_hashing.queue_limit, settings.SERVER_THREADS)
+
+
+class AuthViewParityTests(TestCase):
+    """The template auth views and the API views share auth_services and must agree."""
+
+    def setUp(self):
+        user_cache.clear()
+        blacklist_filter.reset()
+        self.user = User.objects.create_superuser("guest@example.com", "Guest", True, "pass1234")
+        self.api = APIClient()
+        self.site = Client()
+
+    def messages(self, response):
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def api_errors(self, response):
+        return [str(error) for errors in response.data.values() for error in (errors if isinstance(errors, list) else [errors])]
+
+    def test_failed_login_reports_the_same_error(self):
+        credentials = {"email": "guest@example.com", "password": "wrong"}
+        api = self.api.post(reverse("login"), credentials, format="json")
+        site = self.site.post(reverse("login user"), credentials)
+        self.assertEqual(api.status_code, 401)
+        self.assertEqual(self.messages(site), api.data["errors"]["non_field_errors"])
+        self.assertNotIn("access_token", self.site.session)
+
+    def test_failed_registration_reports_the_same_error(self):
+        data = {"name": "Guest", "email": "guest@example.com", "password": "pass1234", "tc": True}
+        api = self.api.post(reverse("register"), {**data, "password2": "pass1234"}, format="json")
+        site = self.site.post(reverse("register user"), {**data, "confirm_password": "pass1234"})
+        self.assertEqual(api.status_code, 400)
+        self.assertEqual(self.messages(site), self.api_errors(api))
+        self.assertEqual(User.objects.filter(email="guest@example.com").count(), 1)
+
+    def test_login_stores_what_the_api_returns(self):
+        credentials = {"email": "guest@example.com", "password": "pass1234"}
+        api = self.api.post(reverse("login"), credentials, format="json")
+        site = self.site.post(reverse("login user"), credentials)
+        self.assertRedirects(site, reverse("homepage"), fetch_redirect_response=False)
+
+        session = self.site.session
+        self.assertEqual(session["is_admin"], api.data["is_admin"])
+        self.assertEqual(AccessToken(session["access_token"])["user_id"], AccessToken(api.data["token"]["access"])["user_id"])
+        self.assertEqual(OutstandingToken.objects.get(token=session["refresh_token"]).user, self.user)
+
+    def test_logout_blacklists_like_the_api(self):
+        self.site.post(reverse("login user"), {"email": "guest@example.com", "password": "pass1234"})
+        refresh = self.site.session["refresh_token"]
+        site = self.site.post(reverse("logout user"))
+        self.assertRedirects(site, reverse("login user"), fetch_redirect_response=False)
+        self.assertNotIn("refresh_token", self.site.session)
+        self.assertEqual(self.messages(self.site.get(site["Location"])), ["Logout successful!"])
+
+        # The token is now blacklisted, so logging it out again fails the same way on both paths
+        self.api.force_authenticate(self.user)
+        api = self.api.post(reverse("logout"), {"refresh": refresh}, format="json")
+        self.assertEqual(api.status_code, 400)
+        session = self.site.session
+        session.update({"access_token": "x", "refresh_token": refresh})
+        session.save()
+        site = self.site.post(reverse("logout user"))
+        self.assertEqual(self.messages(site), [api.data["detail"]])
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("guest@example.com", "Guest", True, "pass1234")
+        self.factory = APIRequestFactory()
+        for i, (location, price) in enumerate([("Pune", 900), ("Goa", 1500), ("Pune", 1200), ("Delhi", 700)]):
+            room = Room.objects.create(
+                image="room_images/home1.jpg", title=f"Room {i}", price=price, location=location, description="flat",
+            )
+            Room.objects.filter(pk=room.pk).update(rating_avg=i, rating_count=1)
+
+    def get(self, view, path, **kwargs):
+        request = self.factory.get(path)
+        force_authenticate(request, self.user)
+        response = async_to_sync(view)(request, **kwargs) if iscoroutinefunction(view) else view(request, **kwargs)
+        return response.render()
+
+    def assertSameResponse(self, sync_view, async_view, path, **kwargs):
+        expected = self.get(sync_view.as_view(), path, **kwargs)
+        actual = self.get(async_view.as_view(), path, **kwargs)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        return actual
+
+    def test_list_matches_sync_view(self):
+        for path in ("/rooms/api/", "/rooms/api/?page_size=2&fields=id,title", "/rooms/api/?cursor=bogus"):
+            with self.subTest(path=path):
+                self.assertSameResponse(views.ListAPIView, views.AsyncListAPIView, path)
+
+    def test_filter_matches_sync_view(self):
+        for path in ("/search/?location=pune", "/search/?sort=rating&page_size=2", "/search/?price_min=x"):
+            with self.subTest(path=path):
+                self.assertSameResponse(views.FilterAPIView, views.AsyncFilterAPIView, path)
+
+    def test_retrieve_matches_sync_view(self):
+        room = Room.objects.first()
+        self.assertSameResponse(views.RetrieveAPIView, views.AsyncRetrieveAPIView, f"/rooms/api/{room.pk}/", id=room.pk)
+        response = self.assertSameResponse(views.RetrieveAPIView, views.AsyncRetrieveAPIView, "/rooms/api/0/", id=0)
+        self.assertEqual(response.status_code, 404)
+
+
+class RoomLocationFilterTests(TestCase):
+    def setUp(self):
+        for title, location in (("A", "Delhi"), ("B", "  New  Delhi "), ("C", "Pune")):
+            Room.objects.create(image="room_images/home1.jpg", title=title, price=900, location=location, description="x")
+
+    def titles(self, location):
+        return sorted(Room.objects.in_location(location).values_list("title", flat=True))
+
+    def test_locations_match_normalized_substrings(self):
+        self.assertEqual(self.titles("delhi"), ["A", "B"])
+        self.assertEqual(self.titles(" NEW   delhi"), ["B"])
+        self.assertEqual(self.titles("pune"), ["C"])
+        self.assertEqual(self.titles("goa"), [])
+        self.assertEqual(self.titles("  "), ["A", "B", "C"])
+
+    def test_rooms_are_read_through_the_location_index(self):
+        with self.assertNumQueries(2):  # the distinct keys, then the rooms
+            list(Room.objects.in_location("delhi").order_by("price", "id"))
+        self.assertIn("room_loc", Room.objects.in_location("delhi").order_by("price", "id").explain())
+
+
+class RoomSearchIndexTests(TestCase):
+    def add_room(self, title):
+        return Room.objects.create(image="room_images/home1.jpg", title=title, price=900, location="Pune", description="x")
+
+    def test_fresh_process_catches_up_with_an_old_snapshot(self):
+        gone = self.add_room("Zanzibarish gone")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "index.pickle")
+            writer = RoomSearchIndex(path)
+            writer.build()
+            writer.save()
+
+            room = self.add_room("Zanzibarish loft")
+            gone.delete()
+            self.assertEqual(RoomSearchIndex(path).search_ids("zanzibarish"), [room.pk])
+
+    def test_writes_from_other_processes_are_picked_up(self):
+        index = RoomSearchIndex(sync_interval=3600)
+        index.build()
+        # Created, edited and deleted without this process' signals reaching `index`
+        Room.objects.bulk_create([Room(image="room_images/home1.jpg", title="Zanzibarish", price=1, location="Goa", description="x")])
+        room = self.add_room("Plain")
+        Room.objects.filter(pk=room.pk).update(title="Zanzibarish plain", updated_at=timezone.now())
+        self.assertEqual(index.search_ids("zanzibarish"), [])
+
+        index.checked_at = 0.0
+        self.assertEqual(len(index.search_ids("zanzibarish")), 2)
+        Room.objects.filter(title="Zanzibarish").delete()
+        index.checked_at = 0.0
+        self.assertEqual(index.search_ids("zanzibarish"), [room.pk])
+
+
+class RoomAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin@example.com", "Admin", True, "pass1234")
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse("admin:testapp_room_changelist")
+
+    def add_rooms(self, count, location="Pune"):
+        return [
+            Room.objects.create(image="room_images/home1.jpg", title=f"Room {i}", price=900, location=location, description="x")
+            for i in range(count)
+        ]
+
+    def test_changelist_queries_do_not_grow_with_the_page(self):
+        self.add_rooms(3)
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.add_rooms(5)
+        with CaptureQueriesContext(connection) as more:
+            response = self.client.get(self.url, {"availability__exact": 1})
+        self.assertEqual(response.context["cl"].result_count, 8)
+        self.assertEqual(len(more), len(few))
+        # Counts are always capped, never a COUNT(*) over the whole table
+        counts = [query["sql"] for query in [*few, *more] if "COUNT(" in query["sql"]]
+        self.assertTrue(counts)
+        self.assertTrue(all("LIMIT" in sql for sql in counts))
+
+    def test_unfiltered_changelist_uses_the_estimated_count(self):
+        self.add_rooms(2)
+        with mock.patch("testapp.admin.estimated_row_count", return_value=50000):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url)
+        self.assertEqual(response.context["cl"].result_count, 50000)
+        self.assertFalse([query["sql"] for query in queries if "COUNT(" in query["sql"]])
+
+    def test_search_by_id_or_part_of_the_location(self):
+        pune, = self.add_rooms(1)
+        delhi, = self.add_rooms(1, location="New Delhi")
+        for term, expected in (("delhi", [delhi]), (str(pune.pk), [pune]), ("goa", [])):
+            with self.subTest(term=term):
+                response = self.client.get(self.url, {"q": term})
+                self.assertEqual(list(response.context["cl"].result_list), expected)
+
+
+class SQLInstrumentationMiddlewareTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("sql@example.com", "Sql", True, "pass1234"))
+        Room.objects.create(image="room_images/home1.jpg", title="Loft", price=900, location="Pune", description="x")
+
+    def test_server_timing_reports_queries(self):
+        response = self.client.get(reverse("list_rooms"))
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ quer(y|ies)", app;dur=[\d.]+$')
+
+    # Threshold 0: any query shape that runs at all counts as repeated
+    @override_settings(SQL_REPEAT_THRESHOLD=0, SQL_REPEAT_ACTION="raise")
+    def test_repeated_queries_raise(self):
+        with self.assertRaises(RepeatedQueryError):
+            self.client.get(reverse("list_rooms"))
+
+    @override_settings(SQL_REPEAT_THRESHOLD=0, SQL_REPEAT_ACTION="warn")
+    def test_repeated_queries_warn(self):
+        with self.assertWarns(RepeatedQueryWarning):
+            response = self.client.get(reverse("list_rooms"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_queries_below_the_threshold_pass(self):
+        with override_settings(SQL_REPEAT_ACTION="raise"), warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.assertEqual(self.client.get(reverse("list_rooms")).status_code, 200)
+
+
+# 'replica' is a second, empty SQLite database here: anything routed to it misses
+# the primary's rows, the same as a replica that hasn't caught up yet
+@override_settings(DATABASE_REPLICAS=["replica"])
+class PrimaryReplicaRouterTests(TestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        routers.unpin()
+        self.addCleanup(routers.unpin)
+
+    def add_room(self, using=None):
+        rooms = Room.objects.using(using) if using else Room.objects
+        return rooms.create(image="room_images/home1.jpg", title="Loft", price=900, location="Pune", description="x")
+
+    def test_reads_use_the_replica_and_writes_the_primary(self):
+        self.add_room(using="replica")
+        with override_settings(DATABASE_READ_YOUR_WRITES_SECONDS=0):
+            room = self.add_room()
+            self.assertTrue(Room.objects.using("default").filter(pk=room.pk).exists())
+            self.assertEqual(Room.objects.count(), 1)
+            self.assertEqual(Room.objects.get().title, "Loft")
+            self.assertEqual(Room.objects.get()._state.db, "replica")
+
+    def test_a_write_pins_reads_to_the_primary(self):
+        room = self.add_room()
+        self.assertEqual(Room.objects.get(pk=room.pk)._state.db, "default")
+        routers.unpin()
+        self.assertFalse(Room.objects.filter(pk=room.pk).exists())
+
+    def test_booking_inserts_on_the_primary(self):
+        user = User.objects.create_user("booker@example.com", "Booker", True, "pass1234")
+        room = self.add_room()
+        routers.unpin()
+        booking, created = Booking.objects.book(user, room.pk, date(2030, 1, 1), date(2030, 1, 2))
+        self.assertTrue(created)
+        self.assertTrue(Booking.objects.using("default").filter(pk=booking.pk).exists())
+        self.assertFalse(Booking.objects.using("replica").exists())
+        self.assertTrue(routers.wrote())
+
+    def test_blacklist_checks_read_the_primary(self):
+        blacklist_filter.reset()
+        self.addCleanup(blacklist_filter.reset)
+        user = User.objects.create_user("guest@example.com", "Guest", True, "pass1234")
+        token = get_tokens_for_user(user)["refresh"]
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(token=token))
+        routers.unpin()
+        self.assertFalse(BlacklistedToken.objects.using("replica").exists())
+        with self.assertRaises(TokenError):
+            RefreshToken(token)
+
+    def test_image_variants_reach_a_room_missing_from_the_replica(self):
+        room = self.add_room()
+        routers.unpin()
+        result = {"source": room.image.name, "variants": [{"name": "room_images/home1.w320.webp", "width": 320, "format": "webp"}]}
+        self.assertEqual(apply_variants(result), 1)
+        self.assertEqual(Room.objects.using("default").get(pk=room.pk).image_variants, result)
+
+    def test_idempotency_entries_are_read_from_the_primary(self):
+        cache = caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+        cache.set("idempotency:1:retry", {"status": 201}, 60)
+        routers.unpin()
+        self.assertEqual(cache.get("idempotency:1:retry"), {"status": 201})
+
+    def test_cache_fills_read_the_primary(self):
+        room = self.add_room()
+        routers.unpin()
+        room_cache.invalidate(room.pk)
+        self.assertEqual(room_cache.get(room.pk)["title"], "Loft")
+        self.assertEqual(review_page_cache.get(room.pk)["results"], [])
+
+    def test_client_that_wrote_reads_its_own_writes(self):
+        data = {"email": "new@example.com", "name": "New", "password": "pass1234", "password2": "pass1234", "tc": True}
+        credentials = {"email": "new@example.com", "password": "pass1234"}
+        writer = APIClient()
+        self.assertEqual(writer.post(reverse("register"), data, format="json").status_code, 201)
+        self.assertIn(ReadYourWritesMiddleware.cookie_name, writer.cookies)
+
+        # Someone else reads the replica, which doesn't have the user yet
+        self.assertEqual(APIClient().post(reverse("login"), credentials, format="json").status_code, 401)
+        self.assertEqual(writer.post(reverse("login"), credentials, format="json").status_code, 200)
+
+
+class JWTSessionMiddlewareTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        blacklist_filter.reset()
+        self.user = User.objects.create_user("guest@example.com", "Guest", True, "pass1234")
+        self.room = Room.objects.create(
+            image="room_images/home1.jpg", title="Loft", price=900, location="Pune", description="x",
+        )
+        self.client = Client()
+
+    def login(self):
+        response = self.client.post(reverse("login user"), {"email": "guest@example.com", "password": "pass1234"})
+        self.assertRedirects(response, reverse("homepage"), fetch_redirect_response=False)
+
+    def details(self):
+        return self.client.get(reverse("room_details", args=[self.room.pk]))
+
+    def test_anonymous_page_view_runs_no_auth_queries(self):
+        self.details()
+        with self.assertNumQueries(0):
+            response = self.details()
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_logged_in_page_view_only_queries_its_own_data(self):
+        self.login()
+        self.details()
+        # The session row (the default cache is per process, so no cached_db) and the user's booking of this room
+        with self.assertNumQueries(2):
+            response = self.details()
+        self.assertEqual(response.wsgi_request.user.pk, self.user.pk)
+
+    def test_deleting_the_session_signs_the_page_out(self):
+        self.login()
+        # The cookie only holds the key; the tokens stay in the session table
+        self.assertTrue(Session.objects.filter(session_key=self.client.cookies[settings.SESSION_COOKIE_NAME].value).exists())
+        self.client.session.delete()
+        self.assertFalse(self.details().wsgi_request.user.is_authenticated)
+
+    def test_expired_access_token_is_refreshed(self):
+        self.login()
+        expired = AccessToken.for_user(self.user)
+        expired.set_exp(lifetime=-timedelta(minutes=1))
+        session = self.client.session
+        session["access_token"] = str(expired)
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+        response = self.details()
+        self.assertEqual(response.wsgi_request.user.pk, self.user.pk)
+        renewed = self.client.session["access_token"]
+        self.assertNotEqual(renewed, str(expired))
+        self.assertEqual(str(AccessToken(renewed)["user_id"]), str(self.user.pk))
+
+    def test_refresh_lost_to_another_process_uses_its_saved_tokens(self):
+        self.login()
+        session_key = self.client.session.session_key
+        # This request loaded the session, with an expired access token, before the other process saved
+        request = RequestFactory().get("/")
+        request.session = SessionStore(session_key)
+        expired = AccessToken.for_user(self.user)
+        expired.set_exp(lifetime=-timedelta(minutes=1))
+        request.session["access_token"] = str(expired)
+
+        # The other process rotated the refresh token and saved the new pair; its
+        # coalescing entry is in its own cache, not this one
+        winner = SessionStore(session_key)
+        serializer = TokenRefreshSerializer(data={"refresh": winner["refresh_token"]})
+        serializer.is_valid(raise_exception=True)
+        winner["access_token"] = serializer.validated_data["access"]
+        winner["refresh_token"] = serializer.validated_data["refresh"]
+        winner.save()
+        cache.clear()
+
+        JWTSessionMiddleware(lambda request: None).install(request)
+        self.assertEqual(request.user.pk, self.user.pk)
+        self.assertEqual(request.session["refresh_token"], serializer.validated_data["refresh"])
+
+    def test_unusable_tokens_log_the_page_out(self):
+        self.login()
+        session = self.client.session
+        session["access_token"] = "not-a-token"
+        session["refresh_token"] = "not-a-token"
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+        response = self.details()
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+        self.assertNotIn("access_token", self.client.session)
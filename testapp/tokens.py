@@ -0,0 +1,223 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication import cached_user
+from .routers import PRIMARY
+
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """Fixed-size bit array answering "maybe present" or "certainly absent" for strings."""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, value):
+        # Double hashing: k positions out of one 128-bit digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(value))
+
+
+class BlacklistFilter:
+    """
+    In-process view of the token blacklist. A jti the filter has never seen
+    is certainly not blacklisted, so most refreshes skip the blacklist query;
+    a "maybe" is confirmed against the table.
+
+    The filter is built from the unexpired blacklisted tokens and then follows
+    the table by id (at most every BLACKLIST_FILTER_SYNC_INTERVAL seconds).
+    Ids are not committed in order, so each sync also asks again for the ids
+    it has not seen up to `sync_margin` below the highest one. Tokens
+    blacklisted by this process are added immediately; ones blacklisted by
+    another process can pass here until the next sync. It is rebuilt from
+    scratch once it holds more entries than it was sized for, which drops
+    expired tokens, and every `rebuild_interval` seconds in case a row
+    committed later than the margin allows for. With `asynchronous` the
+    rebuild runs on a background thread and the current filter keeps
+    answering until it is swapped in; before the first one finishes every
+    token is a "maybe".
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.01, sync_interval=1.0, sync_margin=1000,
+                 rebuild_interval=3600.0, asynchronous=True):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.sync_margin = sync_margin
+        self.rebuild_interval = rebuild_interval
+        self.asynchronous = asynchronous
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.last_id = 0
+        self.gaps = set()  # unseen ids below last_id that may still commit
+        self.synced_at = 0.0
+        self.built_at = 0.0
+        self.rebuilding = False
+        self.pending = []  # jtis added while a rebuild runs, replayed into the new filter
+
+    def build(self):
+        """(filter of the unexpired blacklisted tokens, highest id read, ids missing below it)."""
+        # From the primary: a lagging replica would leave fresh blacklistings out of the filter for good
+        blacklisted = BlacklistedToken.objects.using(PRIMARY)
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        last_id = blacklisted.aggregate(last=Max("id"))["last"] or 0
+        live = blacklisted.filter(id__lte=last_id, token__expires_at__gt=timezone.now())
+        for jti in live.values_list("token__jti", flat=True).iterator(chunk_size=5000):
+            bloom.add(jti)
+        window = range(max(1, last_id - self.sync_margin + 1), last_id + 1)
+        present = blacklisted.filter(id__gte=window.start, id__lte=last_id).values_list("id", flat=True)
+        return bloom, last_id, set(window).difference(present)
+
+    def rebuild(self):
+        with self.lock:
+            self.rebuilding = True
+        try:
+            bloom, last_id, gaps = self.build()
+        except BaseException:
+            with self.lock:
+                self.rebuilding = False
+            raise
+        with self.lock:
+            for jti in self.pending:
+                bloom.add(jti)
+            self.bloom, self.last_id, self.gaps = bloom, last_id, gaps
+            self.pending, self.rebuilding = [], False
+            self.synced_at = self.built_at = time.monotonic()
+
+    def rebuild_due(self):
+        return (self.bloom is None or self.bloom.count > self.capacity
+                or time.monotonic() - self.built_at >= self.rebuild_interval)
+
+    def schedule_rebuild(self):
+        with self.lock:
+            if self.rebuilding or not self.rebuild_due():
+                return
+            self.rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name="blacklist-filter", daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Could not rebuild the token blacklist filter")
+        finally:
+            connections.close_all()
+
+    def sync(self):
+        """Add the rows committed since the last sync: ids above last_id, plus the gaps below it."""
+        added = BlacklistedToken.objects.using(PRIMARY).filter(Q(id__gt=self.last_id) | Q(id__in=self.gaps)).values_list("id", "token__jti")
+        seen = set()
+        for blacklisted_id, jti in added.iterator(chunk_size=5000):
+            seen.add(blacklisted_id)
+            # Tokens this process blacklisted are already in; don't count them twice
+            if jti not in self.bloom:
+                self.bloom.add(jti)
+        last_id = max(seen, default=self.last_id)
+        if last_id > self.last_id:
+            self.gaps.update(range(max(self.last_id + 1, last_id - self.sync_margin + 1), last_id))
+        self.gaps = {gap for gap in self.gaps - seen if gap > last_id - self.sync_margin}
+        self.last_id = max(self.last_id, last_id)
+        self.synced_at = time.monotonic()
+
+    def might_contain(self, jti):
+        if self.asynchronous:
+            self.schedule_rebuild()
+        elif self.rebuild_due():
+            self.rebuild()
+        with self.lock:
+            if self.bloom is None:
+                return True
+            if time.monotonic() - self.synced_at >= self.sync_interval:
+                self.sync()
+            return jti in self.bloom
+
+    def add(self, jti):
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+            if self.rebuilding:
+                self.pending.append(jti)
+
+    def reset(self):
+        with self.lock:
+            self.bloom = None
+            self.last_id = 0
+            self.gaps = set()
+            self.pending = []
+
+
+blacklist_filter = BlacklistFilter(
+    capacity=getattr(settings, "BLACKLIST_FILTER_CAPACITY", 1_000_000),
+    error_rate=getattr(settings, "BLACKLIST_FILTER_ERROR_RATE", 0.01),
+    sync_interval=getattr(settings, "BLACKLIST_FILTER_SYNC_INTERVAL", 1.0),
+    sync_margin=getattr(settings, "BLACKLIST_FILTER_SYNC_MARGIN", 1000),
+    rebuild_interval=getattr(settings, "BLACKLIST_FILTER_REBUILD_INTERVAL", 3600.0),
+    asynchronous=getattr(settings, "BLACKLIST_FILTER_ASYNC_REBUILD", True),
+)
+
+
+class RefreshToken(tokens.RefreshToken):
+    """simplejwt's RefreshToken with the blacklist lookup going through `blacklist_filter` first."""
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if not blacklist_filter.might_contain(jti):
+            return
+        if BlacklistedToken.objects.using(PRIMARY).filter(token__jti=jti).exists():
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        # Same check as simplejwt, with the user read through the authentication cache
+        refresh = self.token_class(attrs["refresh"])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id:
+            user = cached_user(user_id)
+            if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+        return data
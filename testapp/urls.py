@@ -1,10 +1,18 @@
 from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
-from .views import ListAPIView, CreateAPIView, RetrieveAPIView, UpdateAPIView, CancelAPIView, FilterAPIView, UserRegisterationView, UserLoginView, UserLogoutView, UserProfileView, BookingAPIView
+from rest_framework_simplejwt.views import TokenRefreshView
+from .views import ListAPIView, CreateAPIView, RetrieveAPIView, RoomCacheStatsView, UpdateAPIView, CancelAPIView, FilterAPIView, UserRegisterationView, UserLoginView, UserLogoutView, UserProfileView, PasswordHashingStatsView, BookingAPIView, AvailabilityAPIView, RoomReviewsAPIView, AllBookingAPIView
 # from . import views
 from testapp.views import homepage, room_listing, room_details, room_booking, cancel_booking
 from .views import register, login, logout
+from .views import AsyncListAPIView, AsyncRetrieveAPIView, AsyncFilterAPIView, async_room_listing, async_room_details
+
+
+# Serving with rental_app/asgi.py: route the read views to their async versions
+if settings.ASYNC_READ_VIEWS:
+    ListAPIView, RetrieveAPIView, FilterAPIView = AsyncListAPIView, AsyncRetrieveAPIView, AsyncFilterAPIView
+    room_listing, room_details = async_room_listing, async_room_details
 
 
 
@@ -14,13 +22,19 @@ urlpatterns = [
     path('rooms/api/', ListAPIView.as_view(), name='list_rooms'),
     path('rooms/api/create/', CreateAPIView.as_view(), name='create_room'),
     path('rooms/api/<int:id>/', RetrieveAPIView.as_view(), name='retrieve_room'),
+    path('rooms/api/cache_stats/', RoomCacheStatsView.as_view(), name='room_cache_stats'),
     path('rooms/api/<int:id>/update/', UpdateAPIView.as_view(), name='update_room'),
     path('rooms/api/<int:id>/delete/', CancelAPIView.as_view(), name='delete_room'),
-    path('rooms/api/<int:id>/delete/', BookingAPIView.as_view(), name='booking_room'),
+    path('rooms/api/<int:id>/book/', BookingAPIView.as_view(), name='booking_room'),
+    path('rooms/api/<int:id>/reviews/', RoomReviewsAPIView.as_view(), name='room_reviews'),
     path('search/', FilterAPIView.as_view(), name='Search_filter'),
+    path('rooms/api/available/', AvailabilityAPIView.as_view(), name='available_rooms'),
+    path('rooms/api/bookings/', AllBookingAPIView.as_view(), name='my_bookings'),
     path('user_register/api/', UserRegisterationView.as_view(), name='register'),
     path('user_login/api/', UserLoginView.as_view(), name='login'),
     path('user_logout/api/', UserLogoutView.as_view(), name='logout'),
+    path('token_refresh/api/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('user_login/api/hashing_stats/', PasswordHashingStatsView.as_view(), name='password_hashing_stats'),
     path('user_profile/api', UserProfileView.as_view(), name='profile'),
     
     
@@ -2,26 +2,74 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Room, Booking
-from .serializers.room_serializers import RoomSerializer, BookingSerializer
-from .serializers.user_serializers import UserRegisterationSerializer, UserLoginSerializer, LogoutSerializer, UserProfileSerializer                                                      
-
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.permissions import  IsAuthenticated, AllowAny  
-from django.contrib.auth import authenticate 
+from .serializers.room_serializers import RoomSerializer, BookingSerializer, StayRangeSerializer, ReviewSerializer, UserBookingSerializer
+from .pagination import KeysetPage, KeysetPaginator, InvalidCursor, paginated_data
+from .streaming import streaming_json_response, wants_stream
+from .search import asearch_rooms, search_rooms
+from .cache import review_page_cache, review_paginator, room_cache, room_reviews
+from .conditional import PAGE_VALIDATOR_COLUMNS, acollection_validators, collection_validators, object_validators, page_validators
+from .fieldsets import InvalidFields, requested_fields, trim
+from .serializers.fast_serializers import RoomValuesSerializer
+from .idempotency import idempotent, request_key
+from .hashing import HashingBusy, password_hashing
+from .async_api import AsyncAPIView
+from asgiref.sync import sync_to_async
+from .serializers.user_serializers import UserLoginSerializer, UserProfileSerializer                                                      
+from .services.auth_services import AuthServiceError, register_user, login_user, logout_user
+
+from rest_framework.permissions import  IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny, IsAdminUser
 from django.shortcuts import render, get_object_or_404    
+from django.http import Http404
+from django.utils import timezone
+from datetime import timedelta
+import uuid
 # To Book a room
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from .authentication import CachedJWTAuthentication
                         
 
+# Stay used when a booking request doesn't say: tonight only
+def default_stay():
+    check_in = timezone.localdate()
+    return check_in, check_in + timedelta(days=1)
+
+
 #******** Room CRUD operation STARTS here ********************
                                                                                                                                                                                                                                                                                                                          
 # For listing all the rooms
 class ListAPIView(APIView):
+    paginator = KeysetPaginator(ordering=("id",))
+
     def get(self, request):
+        # ?fields=id,title,price / ?omit=description trim the JSON and the SELECT alike
+        try:
+            fields = requested_fields(request.query_params, RoomSerializer)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         queryset = Room.objects.all()
-        serializer = RoomSerializer(queryset, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+        # ?stream=1 exports the whole inventory as one incrementally written array
+        if wants_stream(request):
+            validators = collection_validators(request, queryset)
+            not_modified = validators.not_modified(request)
+            if not_modified is not None:
+                return not_modified
+            return validators.apply(streaming_json_response(queryset, RoomValuesSerializer, fields=fields))
+
+        # Read-only fast path: values_list() tuples in, RoomSerializer-identical dicts out
+        serializer = RoomValuesSerializer(fields=fields)
+        rows = serializer.values(queryset, extra=self.paginator.fields + PAGE_VALIDATOR_COLUMNS)
+        try:
+            page = self.paginator.paginate(rows, request.query_params, key=serializer.key(self.paginator.fields))
+        except InvalidCursor:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Answer If-None-Match from the page's own rows, before serializing anything
+        validators = page_validators(request, page, serializer.key(PAGE_VALIDATOR_COLUMNS))
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        return validators.apply(Response(paginated_data(request, page, serializer.serialize(page.items)), status=status.HTTP_200_OK))
 
 
 # To create a new Room
@@ -38,11 +86,28 @@ class CreateAPIView(APIView):
 class RetrieveAPIView(APIView):                 
     def get(self, request, id):
         try:
-            room = Room.objects.get(pk=id)
-            serializer = RoomSerializer(room)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Room.DoesNotExist:
+            fields = requested_fields(request.query_params, RoomSerializer)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Serialized payload comes from the per-room cache, invalidated on save/delete;
+        # a ?fields= subset is cut from it rather than loaded separately
+        data = room_cache.get(id)
+        if data is None:
             return Response({"error": "Room not found"}, status=status.HTTP_404_NOT_FOUND)
+        validators = object_validators(data, variant=fields and ",".join(fields))
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        return validators.apply(Response(trim(data, fields), status=status.HTTP_200_OK))
+
+
+# Per-process hit/miss counters of the room cache
+class RoomCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(room_cache.stats.snapshot(), status=status.HTTP_200_OK)
 
 
 # To update an existing Room
@@ -60,7 +125,7 @@ class UpdateAPIView(APIView):
 
 
 class CancelAPIView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def delete(self, request, id):
@@ -78,6 +143,9 @@ class CancelAPIView(APIView):
 
 class FilterAPIView(APIView):
     serializer_class = RoomSerializer
+    values_serializer_class = RoomValuesSerializer  # read-only fast path for the listing
+    paginator = KeysetPaginator(ordering=("price", "id"))
+    rating_paginator = KeysetPaginator(ordering=("-rating_avg", "id"))  # ?sort=rating
 
     def get_queryset(self):
         qs = Room.objects.all()
@@ -86,6 +154,8 @@ class FilterAPIView(APIView):
         price_min = self.request.GET.get('price_min')
         price_max = self.request.GET.get('price_max')
         location = self.request.GET.get('location')
+        available = self.request.GET.get('available')
+        min_rating = self.request.GET.get('min_rating')
 
         # Filter by price_min (if provided) - Ensure price is converted to float
         if price_min:
@@ -103,56 +173,240 @@ class FilterAPIView(APIView):
             except ValueError:
                 return Response({"error": "Invalid price format for 'price_max'"}, status=400)
 
-        # Filter by location (if provided) using 'icontains' for case-insensitive matching
+        # Filter by location (if provided) - case-insensitive match on the indexed, normalized key
         if location:
-            qs = qs.filter(location__icontains=location)
+            qs = qs.in_location(location)
+
+        # Filter by availability (if provided)
+        if available:
+            qs = qs.filter(availability=available.lower() in ('1', 'true', 'yes'))
+
+        # Filter by rating (if provided) - reads the denormalized column, no join on reviews
+        if min_rating:
+            try:
+                qs = qs.filter(rating_avg__gte=float(min_rating))
+            except ValueError:
+                return Response({"error": "Invalid rating format for 'min_rating'"}, status=400)
 
         return qs
 
     def get(self, request, *args, **kwargs):
         # Get filtered rooms based on query parameters
         rooms = self.get_queryset()
+        if isinstance(rooms, Response):
+            return rooms
+
+        paginator = self.rating_paginator if request.GET.get('sort') == 'rating' else self.paginator
+        try:
+            fields = requested_fields(request.query_params, self.serializer_class)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Serialize the filtered queryset
-        serializer = self.serializer_class(rooms, many=True)
-        return Response(serializer.data)
+        # Sparse fieldsets: only the requested columns (plus the sort key and validators) are loaded, as tuples
+        serializer = self.values_serializer_class(fields=fields)
+        rows = serializer.values(rooms, extra=paginator.fields + PAGE_VALIDATOR_COLUMNS)
+
+        # Page through the results cheapest first, or best rated first with ?sort=rating
+        try:
+            page = paginator.paginate(rows, request.query_params, key=serializer.key(paginator.fields))
+        except InvalidCursor:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        validators = page_validators(request, page, serializer.key(PAGE_VALIDATOR_COLUMNS))
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+
+        # Serialize the current page only
+        return validators.apply(Response(paginated_data(request, page, serializer.serialize(page.items))))
 
 #******** Room Search and Filter Functionality ENDS here **********
 
 
 
+#******** Async read path STARTS here **********
+# The same read views as coroutines on the async ORM, so an ASGI server
+# (rental_app/asgi.py) keeps no thread per in-flight request. urls.py routes
+# to them when ASYNC_READ_VIEWS is on; under WSGI the sync views are cheaper.
+
+class AsyncListAPIView(AsyncAPIView, ListAPIView):
+    async def get(self, request):
+        try:
+            fields = requested_fields(request.query_params, RoomSerializer)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = Room.objects.all()
+
+        if wants_stream(request):
+            validators = await acollection_validators(request, queryset)
+            not_modified = validators.not_modified(request)
+            if not_modified is not None:
+                return not_modified
+            return validators.apply(streaming_json_response(queryset, RoomValuesSerializer, asynchronous=True, fields=fields))
+
+        serializer = RoomValuesSerializer(fields=fields)
+        rows = serializer.values(queryset, extra=self.paginator.fields + PAGE_VALIDATOR_COLUMNS)
+        try:
+            page = await self.paginator.apaginate(rows, request.query_params, key=serializer.key(self.paginator.fields))
+        except InvalidCursor:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        validators = page_validators(request, page, serializer.key(PAGE_VALIDATOR_COLUMNS))
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        return validators.apply(Response(paginated_data(request, page, serializer.serialize(page.items)), status=status.HTTP_200_OK))
+
+
+class AsyncRetrieveAPIView(AsyncAPIView, RetrieveAPIView):
+    async def get(self, request, id):
+        try:
+            fields = requested_fields(request.query_params, RoomSerializer)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Cache backends are sync (their async API is a thread hop too); a miss loads the room there
+        data = await sync_to_async(room_cache.get)(id)
+        if data is None:
+            return Response({"error": "Room not found"}, status=status.HTTP_404_NOT_FOUND)
+        validators = object_validators(data, variant=fields and ",".join(fields))
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        return validators.apply(Response(trim(data, fields), status=status.HTTP_200_OK))
+
+
+class AsyncFilterAPIView(AsyncAPIView, FilterAPIView):
+    async def get(self, request, *args, **kwargs):
+        # get_queryset reads the distinct location keys for ?location=, so it runs on a thread
+        rooms = await sync_to_async(self.get_queryset)()
+        if isinstance(rooms, Response):
+            return rooms
+
+        paginator = self.rating_paginator if request.GET.get('sort') == 'rating' else self.paginator
+        try:
+            fields = requested_fields(request.query_params, self.serializer_class)
+        except InvalidFields as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.values_serializer_class(fields=fields)
+        rows = serializer.values(rooms, extra=paginator.fields + PAGE_VALIDATOR_COLUMNS)
+        try:
+            page = await paginator.apaginate(rows, request.query_params, key=serializer.key(paginator.fields))
+        except InvalidCursor:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        validators = page_validators(request, page, serializer.key(PAGE_VALIDATOR_COLUMNS))
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        return validators.apply(Response(paginated_data(request, page, serializer.serialize(page.items))))
+
+#******** Async read path ENDS here **********
+
+
+
 #****************************
 # Room Booking STARTS here 
 # ***************************
 class BookingAPIView(APIView):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request, id):
+        check_in, check_out = default_stay()
+        stay = StayRangeSerializer(data={
+            "check_in": request.data.get("check_in", check_in),  # one night from today by default
+            "check_out": request.data.get("check_out", check_out),
+        })
+        if not stay.is_valid():
+            return Response(stay.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # Locks the room, then inserts only if the stay is free
+        booking, created = Booking.objects.book(
+            request.user, id, stay.validated_data["check_in"], stay.validated_data["check_out"],
+            request_key=request_key(request),
+        )
+        if booking is None:
+            if not Room.objects.filter(pk=id).exists():
+                return Response({"error": "Room not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response({"non_field_errors": ["Room is already booked for these dates."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = Response(BookingSerializer(booking).data, status=status.HTTP_201_CREATED)
+        if not created:
+            response["Idempotent-Replayed"] = "true"
+        return response
+
+
+# Rooms free for a whole stay: ?check_in=YYYY-MM-DD&check_out=YYYY-MM-DD
+class AvailabilityAPIView(APIView):
+    paginator = KeysetPaginator(ordering=("id",))
+
+    def get(self, request):
+        stay = StayRangeSerializer(data=request.query_params)
+        if not stay.is_valid():
+            return Response(stay.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        rooms = Room.objects.available_between(stay.validated_data['check_in'], stay.validated_data['check_out'])
         try:
-            room = Room.objects.get(pk=id)
-            data = {
-                "user": request.user.id,  # Get the logged-in user's ID
-                "room": room.id,
-            }
+            page = self.paginator.paginate(rooms, request.query_params)
+        except InvalidCursor:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = RoomSerializer(page.items, many=True)
+        return Response(paginated_data(request, page, serializer.data), status=status.HTTP_200_OK)
 
-            serializer = BookingSerializer(data=data)
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        except Room.DoesNotExist:
+
+# Reviews of a room, newest first. Anyone can read, signed-in users can post
+class RoomReviewsAPIView(APIView):
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request, id):
+        params = request.query_params
+        # The default first page is shared by every visitor and served from cache
+        if "cursor" not in params and "page_size" not in params:
+            data = review_page_cache.get(id)
+            if data is None:
+                return Response({"error": "Room not found"}, status=status.HTTP_404_NOT_FOUND)
+            page = KeysetPage(data["results"], next_cursor=data["next_cursor"])
+            return Response(paginated_data(request, page, data["results"]), status=status.HTTP_200_OK)
+
+        if not Room.objects.filter(pk=id).exists():
             return Response({"error": "Room not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            page = review_paginator.paginate(room_reviews(id), params)
+        except InvalidCursor:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ReviewSerializer(page.items, many=True)
+        return Response(paginated_data(request, page, serializer.data), status=status.HTTP_200_OK)
 
+    def post(self, request, id):
+        room = Room.objects.filter(pk=id).first()
+        if room is None:
+            return Response({"error": "Room not found"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = ReviewSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(room=room, user=request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    
-# To get all the booked rooms
-# class AllBookingAPIView(APIView):
-#     def get(self, request):
-#         bookings = Booking.objects.filter(user=request.user)  # Filter bookings by the logged-in user
-#         serializer = BookingSerializer(bookings, many=True)
-#         return Response(serializer.data, status=status.HTTP_200_OK)
+
+# To get all the booked rooms of the logged-in user, latest stay first
+class AllBookingAPIView(APIView):
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    paginator = KeysetPaginator(ordering=("-check_in", "-id"))
+
+    def get(self, request):
+        # Rooms come in the same query, so a page costs one query however long it is
+        bookings = Booking.objects.filter(user=request.user).select_related('room')
+        try:
+            page = self.paginator.paginate(bookings, request.query_params)
+        except InvalidCursor:
+            return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = UserBookingSerializer(page.items, many=True)
+        return Response(paginated_data(request, page, serializer.data), status=status.HTTP_200_OK)
 
 
 
@@ -160,29 +414,27 @@ class BookingAPIView(APIView):
 # USER Authentication Starts here
 # *******************************
 
-from rest_framework_simplejwt.tokens import RefreshToken
-# To generate token
-def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+# Queue depth, rejections and hash times of the password hashing pool
+class PasswordHashingStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(password_hashing.stats.snapshot(), status=status.HTTP_200_OK)
+
+
+# Registration, login and logout live in services/auth_services.py so the
+# template views below can call them directly instead of going over HTTP
 
-    return {
-        'refresh': str(refresh),
-        'access': str(refresh.access_token),
-    }
-    
 # User Registeration view
 class UserRegisterationView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
-        # Serialize and validate user registration data
-        serializer = UserRegisterationSerializer(data=request.data)
-        if serializer.is_valid():
-            # Save the user and generate tokens
-            user = serializer.save()
-            token = get_tokens_for_user(user)
-            return Response({'token': token, 'msg': "Registration successfully"}, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            payload = register_user(request.data)
+        except AuthServiceError as e:
+            return Response(e.payload, status=e.status_code)
+        return Response(payload, status=status.HTTP_201_CREATED)
         
         
         
@@ -194,19 +446,11 @@ class UserLoginView(APIView):
         # Serialize the login data
         serializer = UserLoginSerializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
-            email = serializer.data.get('email')
-            password = serializer.data.get('password')
-            # Authenticate the user
-            user = authenticate(email=email, password=password)
-            if user is not None:
-                token = get_tokens_for_user(user)
-                return Response({
-                    'token': token,
-                    'msg': "Login Successfully",
-                    'is_admin': user.is_superuser
-                }, status=status.HTTP_200_OK)
-            else:
-                return Response({"errors": {'non_field_errors': ['Email or password is not valid']}}, status=status.HTTP_401_UNAUTHORIZED)
+            try:
+                payload = login_user(serializer.data.get('email'), serializer.data.get('password'))
+            except AuthServiceError as e:
+                return Response(e.payload, status=e.status_code)
+            return Response(payload, status=status.HTTP_200_OK)
         
         
 # User Logout view
@@ -214,21 +458,11 @@ class UserLogoutView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        # Extract the refresh token from the request data
-        refresh_token = request.data.get('refresh')
-
-        if not refresh_token:
-            return Response({"detail": "Refresh token is required"}, status=status.HTTP_400_BAD_REQUEST)
-
         try:
-            # Blacklist the refresh token (you can use `RefreshToken` to revoke it)
-            token = RefreshToken(refresh_token)
-            token.blacklist()  # This requires the `blacklist` feature to be enabled in `rest_framework_simplejwt`
-            
-            return Response({"msg": "Logout Successfully"}, status=status.HTTP_200_OK)
-
-        except Exception as e:
-            return Response({"detail": f"Error: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+            payload = logout_user(request.data.get('refresh'))
+        except AuthServiceError as e:
+            return Response(e.payload, status=e.status_code)
+        return Response(payload, status=status.HTTP_200_OK)
         
         
         
@@ -251,19 +485,88 @@ def homepage(request):
 
 
 # Views to Fetch the data
+room_paginator = KeysetPaginator(ordering=("id",))
+
 def room_listing(request):
-    # Fetch all rooms from the database
-    rooms = Room.objects.all()
-    return render(request, 'testapp/room_listing.html', {'rooms': rooms})
+    # Search box: rank with the in-process index, then load only the top rooms
+    query = request.GET.get('search', '').strip()
+    if query:
+        rooms = search_rooms(query)
+        if request.GET.get('sort') == 'rating':
+            # Ratings are already on the loaded rows, re-sorting costs nothing
+            rooms.sort(key=lambda room: (-room.rating_avg, -room.rating_count))
+        return render(request, 'testapp/room_listing.html', {
+            'rooms': rooms,
+            'search': query,
+        })
+
+    # Fetch one page of rooms from the database
+    try:
+        page = room_paginator.paginate(Room.objects.all(), request.GET)
+    except InvalidCursor:
+        page = room_paginator.paginate(Room.objects.all(), {})
+    return render(request, 'testapp/room_listing.html', {
+        'rooms': page.items,
+        'next_query': page.next_query(request.GET),
+        'previous_query': page.previous_query(request.GET),
+    })
 
 
 
 def room_details(request, id):
-    room = get_object_or_404(Room, pk=id)
+    room = room_cache.get(id)
+    if room is None:
+        raise Http404("Room not found")
     user_booking = None
     if request.user.is_authenticated:
-        user_booking = Booking.objects.filter(user=request.user, room=room).first()
-    return render(request, "testapp/room_details.html", {"room": room, "user_booking": user_booking})
+        user_booking = Booking.objects.filter(user=request.user, room_id=id).first()
+    return render(request, "testapp/room_details.html", {
+        "room": room,
+        "user_booking": user_booking,
+        "booking_key": uuid.uuid4().hex,  # idempotency key for the booking form
+    })
+
+
+# Async twins of room_listing / room_details (see ASYNC_READ_VIEWS). Rendering
+# stays sync: context processors read the session and user lazily.
+arender = sync_to_async(render)
+
+
+async def async_room_listing(request):
+    query = request.GET.get('search', '').strip()
+    if query:
+        rooms = await asearch_rooms(query)
+        if request.GET.get('sort') == 'rating':
+            rooms.sort(key=lambda room: (-room.rating_avg, -room.rating_count))
+        return await arender(request, 'testapp/room_listing.html', {
+            'rooms': rooms,
+            'search': query,
+        })
+
+    try:
+        page = await room_paginator.apaginate(Room.objects.all(), request.GET)
+    except InvalidCursor:
+        page = await room_paginator.apaginate(Room.objects.all(), {})
+    return await arender(request, 'testapp/room_listing.html', {
+        'rooms': page.items,
+        'next_query': page.next_query(request.GET),
+        'previous_query': page.previous_query(request.GET),
+    })
+
+
+async def async_room_details(request, id):
+    room = await sync_to_async(room_cache.get)(id)
+    if room is None:
+        raise Http404("Room not found")
+    user = await request.auser()
+    user_booking = None
+    if user.is_authenticated:
+        user_booking = await Booking.objects.filter(user=user, room_id=id).afirst()
+    return await arender(request, "testapp/room_details.html", {
+        "room": room,
+        "user_booking": user_booking,
+        "booking_key": uuid.uuid4().hex,
+    })
 
 
 # View to cancel the booked room
@@ -273,20 +576,33 @@ from django.contrib import messages
 
 @login_required
 def room_booking(request, id):
-    room = get_object_or_404(Room, pk=id)
-    
     # Restrict superusers from booking rooms
     if request.user.is_superuser:
         messages.error(request, "Superusers cannot book rooms.")
         return redirect("room_listing")
 
     if request.method == "POST":
-        # Check if the user has already booked the room
-        if Booking.objects.filter(user=request.user, room=room).exists():
+        default_in, default_out = default_stay()
+        stay = StayRangeSerializer(data={
+            "check_in": request.POST.get("check_in") or default_in,
+            "check_out": request.POST.get("check_out") or default_out,
+        })
+        if not stay.is_valid():
+            messages.error(request, "Please choose a check-out date after the check-in date.")
+            return redirect("room_details", id=id)
+        check_in, check_out = stay.validated_data["check_in"], stay.validated_data["check_out"]
+
+        # Locked INSERT; the form's booking_key turns a double submit into a no-op
+        booking, created = Booking.objects.book(
+            request.user, id, check_in, check_out, request_key=request.POST.get("booking_key") or None,
+        )
+        if created:
+            messages.success(request, "Room booked successfully!")
+        elif booking is not None or Booking.objects.filter(user=request.user, room_id=id).overlapping(check_in, check_out).exists():
             messages.error(request, "You have already booked this room.")
         else:
-            Booking.objects.create(user=request.user, room=room)
-            messages.success(request, "Room booked successfully!")
+            get_object_or_404(Room, pk=id)
+            messages.error(request, "This room is already booked for those dates.")
         return redirect("room_details", id=id)  # Redirect to room details page
     return redirect("room_listing")  # Redirect to room listing if accessed incorrectly
 
@@ -305,11 +621,17 @@ def cancel_booking(request, id):
 #*********************************
 # Integration for BACKEND to FRONTEND
 # ************************************
-import json
-import requests
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from .forms import RegisterForm
+from .forms import RegisterForm, LoginForm
+
+# Password hashing is saturated: show the form again with a 503 the browser can retry
+def hashing_busy(request, error, template, form):
+    messages.error(request, str(error))
+    response = render(request, template, {'form': form}, status=503)
+    response['Retry-After'] = str(error.wait)
+    return response
+
 
 # Registration function
 def register(request):
@@ -325,21 +647,14 @@ def register(request):
             }
 
             try:
-                response = requests.post(
-                    "http://127.0.0.1:8000/user_register/api/",
-                    data=json.dumps(data),
-                    headers={'Content-Type': 'application/json'}
-                )
-
-                if response.status_code == 201:
-                    messages.success(request, "Registration successful! Please log in.")
-                    return redirect('login user')
-                else:
-                    error_message = response.json().get('msg', 'Something went wrong.')
+                register_user(data)
+                messages.success(request, "Registration successful! Please log in.")
+                return redirect('login user')
+            except AuthServiceError as e:
+                for error_message in e.messages():
                     messages.error(request, error_message)
-
-            except requests.exceptions.RequestException as e:
-                messages.error(request, f"Error communicating with the server: {e}")
+            except HashingBusy as e:
+                return hashing_busy(request, e, 'testapp/register_form.html', form)
         else:
             messages.error(request, "Invalid form submission.")
     else:
@@ -348,45 +663,25 @@ def register(request):
     return render(request, 'testapp/register_form.html', {'form': form})
 
 
-import json
-import requests
-from django.shortcuts import render, redirect
-from django.contrib import messages
-from .forms import LoginForm
-
 # Login function
-# In your login view
 def login(request):
     if request.method == "POST":
         form = LoginForm(request.POST)
         if form.is_valid():
-            data = {
-                "email": form.cleaned_data['email'],
-                "password": form.cleaned_data['password']
-            }
-
             try:
-                response = requests.post(
-                    "http://127.0.0.1:8000/user_login/api/",
-                    data=json.dumps(data),
-                    headers={'Content-Type': 'application/json'}
-                )
-
-                if response.status_code == 200:
-                    user_data = response.json()
-                    request.session['access_token'] = user_data.get('token').get('access')
-                    request.session['refresh_token'] = user_data.get('token').get('refresh')
-                    request.session['is_admin'] = user_data.get('is_admin', False)  # Store admin role in session
-                    messages.success(request, "Login successful!")
-
-                    # Pass the session status to the template
-                    return redirect('homepage')  # Replace with user homepage route
-                else:
-                    error_message = response.json().get('errors', 'Invalid email or password.')
+                user_data = login_user(form.cleaned_data['email'], form.cleaned_data['password'])
+                request.session['access_token'] = user_data.get('token').get('access')
+                request.session['refresh_token'] = user_data.get('token').get('refresh')
+                request.session['is_admin'] = user_data.get('is_admin', False)  # Store admin role in session
+                messages.success(request, "Login successful!")
+
+                # Pass the session status to the template
+                return redirect('homepage')  # Replace with user homepage route
+            except AuthServiceError as e:
+                for error_message in e.messages():
                     messages.error(request, error_message)
-
-            except requests.exceptions.RequestException as e:
-                messages.error(request, f"Error communicating with the server: {e}")
+            except HashingBusy as e:
+                return hashing_busy(request, e, 'testapp/login.html', form)
         else:
             messages.error(request, "Invalid form submission.")
     else:
@@ -408,31 +703,13 @@ def logout(request):
             return redirect('login user')
 
         try:
-            # Prepare the headers for the logout request
-            headers = {
-                'Authorization': f"Bearer {access_token}",  # Include access token in the header
-                'Content-Type': 'application/json'  # Ensure the correct header for JSON data
-            }
-
-            # Send logout request to the API
-            response = requests.post(
-                "http://127.0.0.1:8000/user_logout/api/",
-                headers=headers,  # Send the headers here
-                data=json.dumps({'refresh': refresh_token})  # Include the refresh token in the body
-            )
-
-            if response.status_code == 200:
-                # Logout successful
-                request.session.flush()  # Clear session
-                messages.success(request, "Logout successful!")
-                return redirect('login user')
-            else:
-                messages.error(request, response.json().get('detail', 'Logout failed.'))
-
-        except requests.exceptions.RequestException as e:
-            messages.error(request, f"Server communication error: {e}")
+            logout_user(refresh_token)
+            # Logout successful
+            request.session.flush()  # Clear session
+            messages.success(request, "Logout successful!")
+            return redirect('login user')
+        except AuthServiceError as e:
+            for error_message in e.messages():
+                messages.error(request, error_message)
 
     return render(request, 'testapp/homepage.html')
-
-
-